@@ -7,6 +7,19 @@ Summary
 Function file for function Aggregate. This file is intended to be called by 
 script "StartHere_Script.py". See this script for details.
 
+The steps of function Aggregate are also defined as separate functions in
+this file (SetupData, SetupTable, AggregateInsert, and AggregateToTable) so
+that they can be reused by function AnnotateAggregate (see file
+"AnnotateAggregate.py").
+
+Function AggregateFrames (see the end of this file) aggregates annotated data
+sets that are already in memory, e.g., those returned by function
+AnnotateFrames (see file "Annotate.py"), without reading any file.
+
+Function MergeAggregates (see the end of this file) merges the aggregation
+tables of several shards (see argument Shard below) into the table that
+function Aggregate would have written for all participants at once.
+
 
 Inputs
 ------
@@ -22,7 +35,25 @@ Inputs
     OutputDataFolder = Full path of folder that contains output iMotions data   
                        files. The term "output" is used because the files were
                        output of function Annotate; however, they are now the
-                       input to the current function. Class str. 
+                       input to the current function. The files can be in any
+                       of the formats that function Annotate writes (csv,
+                       parquet, or feather; see "DataFiles.py"). Class str. 
+
+                       If the folder contains no annotated iMotions data files
+                       but contains event index files (see argument
+                       EventIndex of function Annotate), the original
+                       iMotions data files listed in the event index are read
+                       instead, and the rows of each event are taken from the
+                       event index.
+
+                       The column names of the files in the folder are cached
+                       in file "SchemaCache.json" in the folder, so that only
+                       new or changed files have their column names read.
+
+                       The events, in chronological order, are taken from
+                       file "Events.json", which function Annotate writes to
+                       the folder. If this file is not present, the order is
+                       that in which the events occur in the first file.
                        
                        Example: 
                            
@@ -35,6 +66,127 @@ Inputs
                        Example: 
                            
                        AggregateFile = "C:/Users/user1/Documents/AggTable.csv"
+
+    Jobs             = Optional. Number of files to aggregate at the same time,
+                       each in a separate process. The default, 1, aggregates
+                       files one at a time in the current process. The table
+                       written is the same regardless of Jobs. Class int.
+
+                       Example:
+
+                       Jobs = os.cpu_count()
+
+                       Note: on Windows, when Jobs is greater than 1, the
+                       call to Aggregate must be placed under
+                       "if __name__ == '__main__':" in the calling script.
+
+    Float32          = Optional. If True, the expressions are read as 32-bit
+                       rather than 64-bit floating point numbers, which
+                       halves the memory they use. Means are computed with
+                       64-bit numbers either way. The default is False.
+                       Class bool.
+
+                       Example:
+
+                       Float32 = True
+
+    Dtypes           = Optional. Dict of column names and types, which
+                       override the known types of the columns (see
+                       iMotionsColumnTypes in "DataFiles.py"). The default,
+                       None, uses the known types. Class dict.
+
+                       Example:
+
+                       Dtypes = {'Smile': 'float32'}
+
+    Log              = Optional. Full path of a file to which the elapsed
+                       time, rows, and bytes of each phase (e.g., reading and
+                       reducing) of each file are appended as JSON lines,
+                       together with the peak memory, the rows per second so
+                       far, and the estimated time until all files are
+                       aggregated (see "Instrumentation.py"). Alternatively,
+                       a function that is called with each record (a dict).
+                       The default, None, records nothing. Class str or
+                       function.
+
+                       Example:
+
+                       Log = 'C:/Users/User1/Documents/AggregateLog.jsonl'
+
+    Profile          = Optional. ID of a file (e.g., 4001) to aggregate
+                       under the Python profiler (cProfile). The statistics
+                       are written to file "Profile_<ID>.prof" in the folder
+                       of AggregateFile and can be read with module pstats.
+                       The default, None, profiles no file. Class int or str.
+
+                       Example:
+
+                       Profile = 4001
+
+    Statistics       = Optional. List of the statistics to compute for each
+                       expression and event: "count" (number of non-blank
+                       values, i.e., of frames), "mean", "sd" (sample
+                       standard deviation), "min", and "max". All statistics
+                       are computed from the same read of each file, so
+                       adding a statistic does not add reading. The default,
+                       None, computes only the means, in which case the
+                       columns of the table are named after the expressions
+                       (e.g., "Anger"); otherwise they are named after the
+                       expression and statistic (e.g., "Anger_sd"). Class
+                       list of str.
+
+                       Example:
+
+                       Statistics = ['count', 'mean', 'sd']
+
+    Layout           = Optional. "wide" (default) writes one row per ID and
+                       event, with one column per expression and statistic.
+                       "long" writes one row per ID, event, and expression
+                       (column "Expression"), with one column per statistic
+                       (e.g., "mean"). Class str.
+
+                       Example:
+
+                       Layout = "long"
+
+    BinWidth         = Optional. Width, in seconds, of time bins within each
+                       event. If specified, the statistics are computed for
+                       each bin rather than for each event as a whole, and the
+                       table has one row per ID, event, and bin (column
+                       "Bin"). Bin 0 starts at the onset of the event in the
+                       file (the first MediaTime of the event), bin 1
+                       BinWidth seconds later, and so on, up to the last bin
+                       of the event; bins without values are blank. Events
+                       that are not present in a file have no rows. The
+                       default, None, does not bin. Class int or float.
+
+                       Example:
+
+                       BinWidth = 5
+
+    InputCache       = Optional. Full path of a folder in which the original
+                       iMotions data files are cached in a binary form, if
+                       aggregating from an event index (see argument
+                       InputCache of function Annotate). The default, None,
+                       does not cache. Class str.
+
+                       Example:
+
+                       InputCache = 'C:/Users/User1/Documents/iMotionsCache'
+
+    Shard            = Optional. If specified, only the files of the
+                       participants of shard Shard are aggregated, where
+                       Shard is "k/n", the kth of n shards (k from 1 to n; see
+                       argument Shard of function Annotate). The aggregation
+                       tables of shards "1/n" to "n/n" can be merged with
+                       function MergeAggregates (see below). If no
+                       participant belongs to the shard, the aggregation
+                       table has the column names only. The default, None,
+                       aggregates all files. Class str.
+
+                       Example:
+
+                       Shard = '2/8'
                        
 Requires
 --------
@@ -42,6 +194,11 @@ Requires
 - Python 3
 - Pandas 
 - NumPy
+- openpyxl (imported by Annotate.py)
+- Annotate.py (custom file)
+- DataFiles.py (custom file)
+- Instrumentation.py (custom file)
+- PyArrow (optional; only for parquet or feather files)
 
 
 Author
@@ -55,22 +212,44 @@ Suarez Behavioral Labs, College of Business, The University of Akron
 """ 
 
 
-def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile): 
+##### Import packages #####
 
-    
-    ########################################################
-    ##### Import packages and validate input arguments #####
-    ########################################################    
+import pandas as pd      
+import numpy as np
+from os.path import exists, getsize
+from os import listdir  
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 
+from DataFiles import DataFileID, ReadSchemas, ReadData, ReadEventIndex, \
+                      ReadEventOrder, ColumnTypes, IsEventIndex, IsShard, \
+                      InShard, IDOrder
+#Functions shared with Annotate (ReadiMotions reads the original iMotions
+#data files listed in an event index)
+from Annotate import ReadiMotions, ErrorMessage
+from Instrumentation import AddPhase, AddParticipant, RunProfiled, OpenLog, \
+                            LogPhases, LogParticipant
+
+
+#Statistics that can be computed for each expression and event (see argument
+#Statistics)
+AggregateStatistics = ["count", "mean", "sd", "min", "max"]
+
+#Layouts of the aggregation table (see argument Layout)
+AggregateLayouts = ["wide", "long"]
+
+
+def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile, Jobs = 1,
+              Float32 = False, Dtypes = None, Log = None, Profile = None,
+              Statistics = None, Layout = "wide", BinWidth = None,
+              InputCache = None, Shard = None): 
 
-    ##### Import packages ##### 
-    
-    import pandas as pd      
-    import numpy as np
-    from os.path import exists   
-    from os import listdir  
-    import re
     
+    ####################################
+    ##### Validate input arguments #####
+    ####################################
+
     
     ##### Argument validation ##### 
         
@@ -85,6 +264,32 @@ def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile):
     
     assert( len(ExpressionNames) != 0), \
     "Error in Aggregate: ExpressionNames must have length greater than 0."
+
+    assert( type(Jobs) == int and Jobs >= 1 ), \
+    "Error in Aggregate: Jobs must be an integer of 1 or greater."
+
+    assert( type(Float32) == bool ), \
+    "Error in Aggregate: Float32 must be type bool."
+
+    assert( Dtypes == None or \
+            (type(Dtypes) == dict and all(type(i) == str for i in Dtypes)) ), \
+    "Error in Aggregate: Dtypes must be None or a dict with str keys."
+
+    assert( Log == None or type(Log) == str or callable(Log) ), \
+    "Error in Aggregate: Log must be None, type str, or a function."
+
+    assert( Profile == None or type(Profile) in [int, str] ), \
+    "Error in Aggregate: Profile must be None or type int or str."
+
+    #Function defined below
+    ValidateAggregation("Aggregate", Statistics, Layout, BinWidth)
+
+    assert( InputCache == None or type(InputCache) == str ), \
+    "Error in Aggregate: InputCache must be None or type str."
+
+    assert( Shard == None or IsShard(Shard) ), \
+    "Error in Aggregate: Shard must be None or a str 'k/n', where k and n are" \
+    " integers and k is from 1 to n."
     
     #Verify that all elements of ExpressionNames are of type str
     AllStr = True
@@ -161,6 +366,18 @@ def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile):
     "Error in Aggregate: Folder OutputDataFolder does not appear to contain" \
     " any files to be aggregated."
 
+    #Files of the participants of the shard, if any, and the event index
+    #files, which are filtered by participant when read (see function
+    #SetupIndexedData)
+    #Functions defined in DataFiles.py.
+    if Shard != None:
+
+        filesArrayStr = \
+            filesArrayStr[InShard([DataFileID(i) for i in filesArrayStr],
+                                  Shard) | \
+                          np.array([IsEventIndex(i) for i in filesArrayStr],
+                                   dtype = bool)]
+
     
     ##### Column names to use in iMotions data files ##### 
     
@@ -182,220 +399,56 @@ def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile):
         OutputDataFolder = OutputDataFolder[:-2]
     
     
-    ######################################################
-    ##### Define function to setup aggregation table #####
-    ######################################################
-    
-    def SetupData(OutputDataFolder, ColumnNames, filesArrayStr): 
-    
-        
-        ##### Remove non-annotated iMotions data files from list #####
-        
-        #Remove files that are not csv files and files that do not have the
-        #columns that an annotated iMotions data file should have.
-        
-        #Initialize Boolean index of non-annotated iMotions files
-        NoniMotionsBoolIdx = np.tile(False, filesArrayStr.size)
-        
-        #Loop through files
-        for i in range(0, filesArrayStr.size):
-            
-            fileIth = filesArrayStr[i]
-            
-            #If not a csv file             
-            if fileIth[-3 : filesArrayStr.size] != "csv":
-                
-                #Mark as non-iMotions file
-                NoniMotionsBoolIdx[i] = True  
-                
-            else:    
-                
-                path = OutputDataFolder + "/" + fileIth              
-                
-                #Read the first couple rows of the file
-                dataIth = \
-                    pd.read_csv(path, 
-                                nrows = 1,
-                                memory_map = True) #default False 
-                    
-                #Determine whether the columns that should be in an annotated
-                #iMotions file are present:
-                                    
-                ColumnNamesN = len(ColumnNames)            
-
-                for j in range(0, ColumnNamesN):
-                    
-                    #If any required column is not present
-                    if not (ColumnNames[j] in dataIth.columns):
-                        
-                        #Mark as non-iMotions file
-                        NoniMotionsBoolIdx[i] = True
-                        
-                        break                
-        
-        #Remove non-annotated iMotions files from array                
-        if NoniMotionsBoolIdx.any():             
- 
-            filesArrayStr = filesArrayStr[~ NoniMotionsBoolIdx]              
-       
-        #Verify at least one annotated iMotions file present
-        assert(filesArrayStr.size != 0), \
-        "Error in Aggregate: No annotated iMotions files appear to be present"\
-        " in folder OutputDataFolder."
-           
-        
-        ##### Remove file extension ######
-        
-        #Remove '.csv' from file names
-        filesArrayStr = np.char.rstrip(filesArrayStr, chars = ".csv")
-                          
-        
-        ##### Preallocate aggregation table #####
-                           
-        #Unique events:
-         
-        path = OutputDataFolder + "/" + filesArrayStr[0] + ".csv"   
-         
-        dataIth = \
-            pd.read_csv(path, 
-                        usecols = ['Event'], 
-                        memory_map = True) #default False                      
-        
-        NEvents = len(pd.Categorical(dataIth.Event).categories)   
-        
-        #ID Column:                  
-
-        #Length is number of events * number of participants
-        #Wrap in Pandas categorical series.       
-        ID = pd.Categorical( filesArrayStr.repeat(repeats = NEvents) )
-
-        #Events column:                   
-        
-        #Preallocate categorical object of events, which will be   
-        #sorted by chronological order.
-        EventsSorted = list(range(NEvents)) 
-        
-        EventIth = dataIth.Event[0]        
-        jj = 0
-        EventsSorted[jj] = EventIth
-        
-        #Sort events by chronological order
-        #Do so by determining the order of occurrence in an iMotions data file.
-        for j in range(0, len(dataIth.Event)):
-            
-            if EventIth != dataIth.Event[j]:
-                
-                jj = jj + 1
-                
-                EventsSorted[jj] = dataIth.Event[j]
-                
-                EventIth = dataIth.Event[j]
- 
-        #Repeat events by number of participants            
-        EventsByID = np.tile(EventsSorted, filesArrayStr.size)
-        
-        #Cast to class categorical
-        Event = pd.Categorical(EventsByID, categories = EventsSorted)                       
-   
-        #Assign table:
-                         
-        AggregateTable = \
-            pd.DataFrame(
-                {
-                    "ID":       ID,
-                    "Event":    Event,
-                }
-            ) 
-            
-        #Preallocate expression aggregation columns:    
-            
-        ExpressionAgg = \
-            pd.Series(np.nan, 
-                      index = list(range(filesArrayStr.size * NEvents)))                 
-      
-        #Insert the preallocated column into each of the expression columns
-        for i in ColumnNames:
-            
-            if (i == "Event"):
-            
-                continue
-            
-            AggregateTable[i] = ExpressionAgg
-  
-    
-        return [EventsSorted, NEvents, AggregateTable, filesArrayStr] 
-                
-    
-    ########################################
-    ##### Define function to aggregate #####
-    ######################################## 
-    
-    def AggregateToTable(OutputDataFolder, ExpressionNames, ColumnNames, 
-                         EventsSorted, NEvents, AggregateTable, filesArrayStr):
-          
-        print("\nAggregating...")  
-        
-        #Loop across files
-        for i in range(0, filesArrayStr.size):
-            
-            fileIth = filesArrayStr[i]  
-            
-            print("..." + fileIth)
-               
-            path = OutputDataFolder + "/" + fileIth + ".csv"
-                
-            #Extract needed columns from annotated iMotions data file
-            dataIth = \
-                pd.read_csv(path, 
-                            usecols = ColumnNames, 
-                            memory_map = True) #default False 
-            
-            #Loop across events
-            for j in range(0, NEvents):
-                               
-                EventJth = EventsSorted[j]
-                
-                EventJthBoolIdx = dataIth.Event == EventJth                   
-                    
-                #Loop across expressions
-                for k in range(0, len(ExpressionNames)):
-                    
-                    ExpressionNameKth = ExpressionNames[k]
-                    
-                    ExpressionKth = \
-                        dataIth.loc[EventJthBoolIdx, ExpressionNameKth]
-                    
-                    RowBoolIdx = \
-                        (AggregateTable.ID == fileIth) & \
-                        (AggregateTable.Event == EventJth)
-                    
-                    AggregateTable.loc[RowBoolIdx, ExpressionNameKth] = \
-                        ExpressionKth.mean()
-     
-        
-        return AggregateTable
-     
-        
     ########################################################
     ##### Aggregate and write aggregation table to csv #####
     ########################################################
     
     #Setup data:
         
-    #Function defined previously
-    Out = SetupData(OutputDataFolder, ColumnNames, filesArrayStr) 
+    #Function defined below
+    Start = time.perf_counter()
+
+    Out = SetupData(OutputDataFolder, ColumnNames, filesArrayStr, Statistics,
+                    Shard)
+
+    #Log the setup
+    #Functions defined in Instrumentation.py.
+    WriteRecord = OpenLog(Log)
+
+    if WriteRecord != None:
+
+        SetupPhases = {}
+
+        AddPhase(SetupPhases, "SetupData", Start)
+
+        LogPhases(WriteRecord, "Aggregate", None, SetupPhases)
     
     EventsSorted   = Out[0] 
     NEvents        = Out[1] 
     AggregateTable = Out[2] 
     filesArrayStr  = Out[3]  
+    pathsArrayStr  = Out[4]
+    RunsByID       = Out[5]
+
+    #File of the statistics of the file to profile, if any
+    ProfileFiles = \
+        [AggregateFile[: LastMatchIdx] + "/Profile_" + i + ".prof"
+         if Profile != None and i == str(Profile) else None
+         for i in filesArrayStr]
     
     #Return aggregation table:
     
-    #Function defined previously
+    #Function defined below
+    AggregateTable = \
+        AggregateToTable(pathsArrayStr, ExpressionNames, ColumnNames, 
+                         EventsSorted, NEvents, AggregateTable, filesArrayStr,
+                         Jobs, RunsByID, ColumnTypes(Dtypes, Float32),
+                         WriteRecord, ProfileFiles, Statistics, BinWidth,
+                         InputCache)
+
+    #Function defined below
     AggregateTable = \
-        AggregateToTable(OutputDataFolder, ExpressionNames, ColumnNames, 
-                         EventsSorted, NEvents, AggregateTable, filesArrayStr)                        
+        FinishTable(AggregateTable, ExpressionNames, Statistics, Layout)
             
     #Write to csv:
         
@@ -407,3 +460,1012 @@ def Aggregate(ExpressionNames, OutputDataFolder, AggregateFile):
 
     print("\nAggregation operations completed." + \
           "\nFiles written to " + AggregateFile + ".\n") 
+
+
+######################################################
+##### Define function to setup aggregation table #####
+######################################################
+
+def SetupData(OutputDataFolder, ColumnNames, filesArrayStr,
+              Statistics = None, Shard = None): 
+
+    
+    ##### Remove non-annotated iMotions data files from list #####
+    
+    #Remove files that are not in a data file format (csv, parquet, or
+    #feather; see "DataFiles.py") and files that do not have the columns that
+    #an annotated iMotions data file should have.
+    
+    #Column names of each data file
+    #Only the column headers are read, several files at the same time, and
+    #they are cached (see function ReadSchemas in "DataFiles.py"). Files that
+    #are not in a data file format, or binary data files if PyArrow, which is
+    #required to read them, is not installed, are not included.
+    #Function defined in DataFiles.py.
+    Schemas = ReadSchemas(OutputDataFolder, filesArrayStr)
+
+    #Initialize Boolean index of non-annotated iMotions files
+    NoniMotionsBoolIdx = np.tile(False, filesArrayStr.size)
+    
+    #Loop through files
+    for i in range(0, filesArrayStr.size):
+        
+        fileIth = filesArrayStr[i]
+
+        #If not a data file
+        if not (fileIth in Schemas):
+            
+            #Mark as non-iMotions file
+            NoniMotionsBoolIdx[i] = True  
+
+            continue
+                
+        #Determine whether the columns that should be in an annotated
+        #iMotions file are present
+        Missing = [j for j in ColumnNames if not (j in Schemas[fileIth])]
+
+        #If any required column is not present
+        if len(Missing) != 0:
+                
+            #Mark as non-iMotions file
+            NoniMotionsBoolIdx[i] = True
+
+            print("...File " + fileIth + " does not have column(s) " + \
+                  ", ".join(Missing) + ". Skipping file.")
+    
+    #Event index files, if any
+    #Function defined in DataFiles.py.
+    Runs = ReadEventIndex(OutputDataFolder, filesArrayStr)
+
+    #Remove non-annotated iMotions files from array                
+    if NoniMotionsBoolIdx.any():             
+
+        filesArrayStr = filesArrayStr[~ NoniMotionsBoolIdx]              
+
+    #If there are no annotated iMotions files but there is an event index,
+    #aggregate the original iMotions files listed in the event index
+    #Function defined below.
+    if filesArrayStr.size == 0 and Runs is not None and len(Runs) != 0:
+
+        return SetupIndexedData(Runs, ColumnNames, OutputDataFolder,
+                                Statistics, Shard)
+
+    #If the shard has no participants, the aggregation table of the shard is
+    #empty
+    #Function defined below.
+    if filesArrayStr.size == 0 and Shard != None:
+
+        return SetupEmptyShard(ColumnNames, Shard, Statistics)
+   
+    #Verify at least one annotated iMotions file present
+    assert(filesArrayStr.size != 0), \
+    "Error in Aggregate: No annotated iMotions files appear to be present"\
+    " in folder OutputDataFolder."
+
+    #Verify one annotated iMotions file per participant, e.g., not both
+    #"4001.csv" and "4001.parquet" (or "4001.csv.gz") from runs with
+    #different OutputFormat (or Compression)
+    #Function defined in DataFiles.py.
+    IDs, Counts = np.unique([DataFileID(i) for i in filesArrayStr],
+                            return_counts = True)
+
+    assert( (Counts == 1).all() ), \
+    "Error in Aggregate: Folder OutputDataFolder has more than one annotated" \
+    " iMotions file of participant(s) " + ", ".join(IDs[Counts > 1]) + \
+    " (e.g., from runs of Annotate with different OutputFormat or" \
+    " Compression). Remove the files that are out of date."
+       
+    
+    ##### Remove file extension ######
+
+    #Files in the order of their IDs, so that the aggregation table does not
+    #depend on the order in which the files are listed
+    #Function defined in DataFiles.py.
+    filesArrayStr = \
+        filesArrayStr[IDOrder([DataFileID(i) for i in filesArrayStr])]
+
+    #Full paths of files
+    pathsArrayStr = \
+        np.array([OutputDataFolder + "/" + i for i in filesArrayStr])
+    
+    #Remove extension (e.g., '.csv') from file names
+    #Function defined in DataFiles.py.
+    filesArrayStr = np.array([DataFileID(i) for i in filesArrayStr])
+                      
+    
+    ##### Preallocate aggregation table #####
+                       
+    #Events in chronological order:
+
+    #Function defined below
+    EventsSorted = SetupEvents(OutputDataFolder, pathsArrayStr[0])
+
+    NEvents = len(EventsSorted)
+
+    #Assign table:
+
+    #Function defined below
+    AggregateTable = \
+        SetupTable(filesArrayStr, EventsSorted, ColumnNames, Statistics)
+
+
+    return [EventsSorted, NEvents, AggregateTable, filesArrayStr, 
+            pathsArrayStr, None]
+
+
+def SetupIndexedData(Runs, ColumnNames, OutputDataFolder, Statistics = None,
+                     Shard = None):
+
+    #Setup data from an event index (see function ReadEventIndex in
+    #"DataFiles.py") rather than from annotated iMotions data files. The
+    #original iMotions data file of each participant is listed in column
+    #"SourceFile".
+
+    #Participants of the shard, if any
+    #Function defined in DataFiles.py.
+    Runs = Runs[InShard(Runs.ID, Shard)]
+
+    #Function defined below
+    if len(Runs) == 0:
+
+        return SetupEmptyShard(ColumnNames, Shard, Statistics)
+
+    #IDs in order (see function SetupData)
+    #Function defined in DataFiles.py.
+    filesArrayStr = np.array(pd.unique(Runs.ID), dtype = str)
+
+    filesArrayStr = filesArrayStr[IDOrder(filesArrayStr)]
+
+    RunsByID = [Runs[Runs.ID == i] for i in filesArrayStr]
+
+    pathsArrayStr = np.array([i.SourceFile.iloc[0] for i in RunsByID])
+
+    #Events in chronological order
+    #If the order was not written by function Annotate, it is the order of
+    #the first participant.
+    #Function defined in DataFiles.py.
+    EventsSorted = ReadEventOrder(OutputDataFolder)
+
+    if EventsSorted == None:
+
+        EventsSorted = list(pd.unique(RunsByID[0].Event))
+
+    NEvents = len(EventsSorted)
+
+    #Function defined below
+    AggregateTable = \
+        SetupTable(filesArrayStr, EventsSorted, ColumnNames, Statistics)
+
+
+    return [EventsSorted, NEvents, AggregateTable, filesArrayStr,
+            pathsArrayStr, RunsByID]
+
+
+def SetupEmptyShard(ColumnNames, Shard, Statistics = None):
+
+    #Setup data for a shard without any participant (see argument Shard of
+    #function Aggregate). Such a shard is likely if there are few
+    #participants per shard. The aggregation table has no rows but the same
+    #columns as that of any other shard, so that it can be merged with them
+    #(see function MergeAggregates).
+
+    print("...No files of participants of shard " + Shard + "." + \
+          " Writing an empty aggregation table.")
+
+    filesArrayStr = np.array([], dtype = str)
+
+    #Function defined below
+    AggregateTable = SetupTable(filesArrayStr, [], ColumnNames, Statistics)
+
+
+    return [[], 0, AggregateTable, filesArrayStr, np.array([], dtype = str),
+            None]
+
+
+def SetupEvents(OutputDataFolder, path):
+
+    #Return the events in chronological order.
+
+    #The order is the order of the column headers of the Excel annotations
+    #file, which function Annotate writes to OutputDataFolder (see function
+    #WriteEventOrder in "DataFiles.py"). This includes every event, whether or
+    #not it occurs in a given file.
+    #Function defined in DataFiles.py.
+    EventsSorted = ReadEventOrder(OutputDataFolder)
+
+    if EventsSorted != None:
+
+        return EventsSorted
+
+    #If the order was not written, it is determined by the order of
+    #occurrence in the annotated iMotions data file path. Only the first row
+    #of each run of rows with the same event is kept; rows without an event
+    #are not included.
+    #Function defined in DataFiles.py.
+    Event = ReadData(path, usecols = ['Event']).Event
+
+    Event = Event[Event.ne(Event.shift())].dropna()
+
+
+    return list(pd.unique(Event))
+
+
+############################################################
+##### Define function to preallocate aggregation table #####
+############################################################
+
+def SetupTable(filesArrayStr, EventsSorted, ColumnNames, Statistics = None):
+
+    #Number of events
+    NEvents = len(EventsSorted)
+
+    #ID Column:                  
+
+    #Length is number of events * number of participants
+    #Wrap in Pandas categorical series.       
+    ID = pd.Categorical( filesArrayStr.repeat(repeats = NEvents) )
+
+    #Repeat events by number of participants            
+    EventsByID = np.tile(EventsSorted, filesArrayStr.size)
+    
+    #Cast to class categorical
+    Event = pd.Categorical(EventsByID, categories = EventsSorted)                       
+
+    #Assign table:
+                     
+    AggregateTable = \
+        pd.DataFrame(
+            {
+                "ID":       ID,
+                "Event":    Event,
+            }
+        ) 
+        
+    #Preallocate expression aggregation columns:    
+        
+    ExpressionAgg = \
+        pd.Series(np.nan, 
+                  index = list(range(filesArrayStr.size * NEvents)))                 
+  
+    #Insert the preallocated column into each of the expression columns, one
+    #per statistic
+    #Function defined below.
+    for i in StatisticColumns([j for j in ColumnNames if j != "Event"],
+                              Statistics):
+        
+        AggregateTable[i] = ExpressionAgg
+
+
+    return AggregateTable
+
+
+def ValidateAggregation(Function, Statistics = None, Layout = "wide",
+                        BinWidth = None):
+
+    #Verify arguments Statistics, Layout, and BinWidth of function Function
+    #(e.g., "Aggregate")
+
+    assert( Statistics == None or \
+            (type(Statistics) == list and len(Statistics) != 0 and \
+             all(i in AggregateStatistics for i in Statistics) and \
+             len(set(Statistics)) == len(Statistics)) ), \
+    "Error in " + Function + ": Statistics must be None or a list of one or" \
+    " more of " + ", ".join(AggregateStatistics) + ", without repeats."
+
+    assert( Layout in AggregateLayouts ), \
+    "Error in " + Function + ": Layout must be one of " + \
+    ", ".join(AggregateLayouts) + "."
+
+    assert( BinWidth == None or \
+            (type(BinWidth) in [int, float] and BinWidth > 0) ), \
+    "Error in " + Function + ": BinWidth must be None or a number greater" \
+    " than 0."
+
+
+def StatisticColumns(ExpressionNames, Statistics = None):
+
+    #Names of the columns of the aggregation table, one per expression and
+    #statistic, with the statistics of an expression next to one another. If
+    #only the means are computed (the default), the columns are named after
+    #the expressions.
+
+    if Statistics == None or Statistics == ["mean"]:
+
+        return list(ExpressionNames)
+
+    return [i + "_" + j for i in ExpressionNames for j in Statistics]
+
+
+def FinishTable(AggregateTable, ExpressionNames, Statistics = None,
+                Layout = "wide"):
+
+    #Return the aggregation table in the layout to be written (see argument
+    #Layout of function Aggregate). Counts are written as integers.
+
+    if Statistics == None:
+
+        Statistics = ["mean"]
+
+    #Function defined above
+    Columns = StatisticColumns(ExpressionNames, Statistics)
+
+    #Columns that identify a row, i.e., "ID", "Event", and, if binned, "Bin"
+    Keys = [i for i in AggregateTable.columns if not (i in Columns)]
+
+    if Layout == "wide":
+
+        for i, Column in enumerate(Columns):
+
+            if Statistics[i % len(Statistics)] == "count":
+
+                AggregateTable[Column] = AggregateTable[Column].astype("Int64")
+
+        return AggregateTable
+
+    #One row per ID, event, and expression
+    #The columns of the statistics of an expression are next to one another
+    #(see function StatisticColumns), so the values of each row of the wide
+    #table are reshaped into one row per expression.
+    NExpressions = len(ExpressionNames)
+
+    LongTable = \
+        AggregateTable[Keys].loc[AggregateTable.index.repeat(NExpressions)] \
+                            .reset_index(drop = True)
+
+    LongTable["Expression"] = \
+        pd.Categorical(np.tile(ExpressionNames, len(AggregateTable)),
+                       categories = ExpressionNames)
+
+    Values = \
+        AggregateTable[Columns].to_numpy().reshape(-1, len(Statistics))
+
+    for i, Statistic in enumerate(Statistics):
+
+        LongTable[Statistic] = Values[:, i]
+
+        if Statistic == "count":
+
+            LongTable[Statistic] = LongTable[Statistic].astype("Int64")
+
+
+    return LongTable
+
+
+##################################################
+##### Define functions to aggregate one file #####
+##################################################
+
+def ReduceData(dataIth, ExpressionNames, EventsSorted, Statistics = None):
+
+    #Aggregate an annotated iMotions data set into an array with one row per
+    #event (in the order of EventsSorted) and, for each expression (in the
+    #order of ExpressionNames), one column per statistic (in the order of
+    #Statistics; see function StatisticColumns). The default, None, computes
+    #only the means.
+
+    #Event of each row as an integer code, i.e., its position in EventsSorted
+    #(-1 if the event of the row is not in EventsSorted or is blank)
+    Codes = pd.Categorical(dataIth.Event, categories = EventsSorted).codes
+
+    #Function defined below
+    return ReduceGroups(dataIth, ExpressionNames, Codes, len(EventsSorted),
+                        Statistics)
+
+
+def ReduceBins(dataIth, ExpressionNames, EventsSorted, BinWidth,
+               Statistics = None):
+
+    #Aggregate an annotated iMotions data set into a table with one row per
+    #event and time bin of BinWidth seconds from the onset of the event (see
+    #argument BinWidth of function Aggregate), with columns "Event", "Bin",
+    #and, for each expression, one column per statistic (see function
+    #StatisticColumns).
+
+    #The bin of each row is computed from its MediaTime (in ms) for all rows
+    #at once, and each (event, bin) pair is given one integer code, so that
+    #the statistics of all bins are computed by the same segmented reductions
+    #as those of whole events (function ReduceGroups) rather than by looping
+    #over bins.
+
+    Codes = pd.Categorical(dataIth.Event, categories = EventsSorted) \
+              .codes.astype(np.int64)
+
+    Time = dataIth.MediaTime.to_numpy(dtype = np.float64)
+
+    NEvents = len(EventsSorted)
+
+    #Rows with an event and a MediaTime
+    Valid = (Codes != -1) & ~ np.isnan(Time)
+
+    #Onset of each event, i.e., its first MediaTime
+    Onsets = np.full(NEvents, np.inf)
+
+    np.minimum.at(Onsets, Codes[Valid], Time[Valid])
+
+    #Bin of each row
+    Bins = np.full(Codes.size, -1, dtype = np.int64)
+
+    Bins[Valid] = \
+        np.floor((Time[Valid] - Onsets[Codes[Valid]]) / (BinWidth * 1000)) \
+          .astype(np.int64)
+
+    #Last bin of each event (-1 if the event is not present)
+    LastBins = np.full(NEvents, -1, dtype = np.int64)
+
+    np.maximum.at(LastBins, Codes[Valid], Bins[Valid])
+
+    NBins = int(LastBins.max()) + 1
+
+    #Code of the (event, bin) pair of each row
+    Groups = np.where(Valid, Codes * NBins + Bins, -1)
+
+    #Function defined below
+    Results = ReduceGroups(dataIth, ExpressionNames, Groups, NEvents * NBins,
+                           Statistics)
+
+    #Keep the bins from the onset to the last bin of each event
+    GroupEvents = np.repeat(np.arange(NEvents), NBins)
+    GroupBins   = np.tile(np.arange(NBins), NEvents)
+
+    Keep = GroupBins <= LastBins[GroupEvents]
+
+    BinTable = \
+        pd.DataFrame(
+            {
+                "Event": pd.Categorical.from_codes(GroupEvents[Keep],
+                                                   categories = EventsSorted),
+                "Bin":   GroupBins[Keep]
+            }
+        )
+
+    #Function defined above
+    Columns = StatisticColumns(ExpressionNames, Statistics)
+
+    BinTable[Columns] = Results[Keep]
+
+
+    return BinTable
+
+
+def ReduceGroups(dataIth, ExpressionNames, Codes, NGroups, Statistics = None):
+
+    #Compute the statistics of each expression for each group of rows, where
+    #Codes holds the group of each row (0 to NGroups - 1, or -1 for rows that
+    #belong to no group). Returns an array with one row per group and, for
+    #each expression, one column per statistic (see function ReduceData).
+
+    if Statistics == None:
+
+        Statistics = ["mean"]
+
+    Results = np.full((NGroups, len(ExpressionNames), len(Statistics)), np.nan)
+
+    #Sum and count the non-blank values of each group, one expression at a
+    #time. The sums are accumulated as 64-bit numbers, even if the
+    #expressions were read as 32-bit numbers (see argument Float32). Groups
+    #that are not present in the data set (e.g., events) are NaN (count 0).
+    for j, Name in enumerate(ExpressionNames):
+
+        Values = dataIth[Name].to_numpy(dtype = np.float64)
+
+        Keep = (Codes != -1) & ~ np.isnan(Values)
+
+        CodesKeep  = Codes[Keep]
+        ValuesKeep = Values[Keep]
+
+        Sums   = np.bincount(CodesKeep, weights = ValuesKeep,
+                             minlength = NGroups)
+        Counts = np.bincount(CodesKeep, minlength = NGroups)
+
+        Means = np.full(NGroups, np.nan)
+
+        np.divide(Sums, Counts, out = Means, where = Counts != 0)
+
+        Stats = {"count": Counts, "mean": Means}
+
+        #Sample standard deviation
+        #The squared deviations from the mean of the group are summed, rather
+        #than the squared values, which avoids the loss of precision of
+        #subtracting two large, nearly equal numbers. The values are already
+        #in memory, so this does not read the file again.
+        if "sd" in Statistics:
+
+            SumSquares = \
+                np.bincount(CodesKeep,
+                            weights = (ValuesKeep - Means[CodesKeep]) ** 2,
+                            minlength = NGroups)
+
+            Variances = np.full(NGroups, np.nan)
+
+            np.divide(SumSquares, Counts - 1, out = Variances,
+                      where = Counts > 1)
+
+            Stats["sd"] = np.sqrt(Variances)
+
+        #Minimum and maximum
+        if "min" in Statistics:
+
+            Stats["min"] = np.full(NGroups, np.inf)
+
+            np.minimum.at(Stats["min"], CodesKeep, ValuesKeep)
+
+            Stats["min"][Counts == 0] = np.nan
+
+        if "max" in Statistics:
+
+            Stats["max"] = np.full(NGroups, - np.inf)
+
+            np.maximum.at(Stats["max"], CodesKeep, ValuesKeep)
+
+            Stats["max"][Counts == 0] = np.nan
+
+        for k, Statistic in enumerate(Statistics):
+
+            Results[:, j, k] = Stats[Statistic]
+
+
+    return Results.reshape(NGroups, len(ExpressionNames) * len(Statistics))
+
+
+def ReduceFile(path, ColumnNames, ExpressionNames, EventsSorted, Types = None,
+               Statistics = None, BinWidth = None, InputCache = None,
+               Runs = None, Phases = None):
+
+    #The elapsed time, rows, and bytes of phases "Read" and "Reduce" are added
+    #to dict Phases, if specified (see file "Instrumentation.py").
+
+    Start = time.perf_counter()
+        
+    #Extract needed columns from annotated iMotions data file
+    #Function defined in DataFiles.py.
+    #"MediaTime" is also needed to bin the rows.
+    if Runs is None:
+
+        dataIth = ReadData(path,
+                           usecols = ColumnNames + ["MediaTime"]
+                                     if BinWidth != None else ColumnNames,
+                           dtype = Types)
+
+    #Extract needed columns from original iMotions data file and label the
+    #rows of each event from the event index
+    #Function defined in Annotate.py.
+    else:
+
+        dataIth = \
+            ReadiMotions(path, usecols = ["MediaTime"] + ExpressionNames,
+                         dtype = Types, InputCache = InputCache)
+
+        Codes = np.full(len(dataIth), -1, dtype = np.int64)
+
+        for Event, StartRow, EndRow in \
+            zip(Runs.Event, Runs.StartRow, Runs.EndRow):
+
+            if Event in EventsSorted:
+
+                Codes[StartRow : EndRow] = EventsSorted.index(Event)
+
+        dataIth["Event"] = \
+            pd.Categorical.from_codes(Codes, categories = EventsSorted)
+
+    #Function defined in Instrumentation.py
+    AddPhase(Phases, "Read", Start, len(dataIth), getsize(path))
+
+    Start = time.perf_counter()
+
+    #Functions defined above
+    if BinWidth == None:
+
+        Means = ReduceData(dataIth, ExpressionNames, EventsSorted, Statistics)
+
+    else:
+
+        Means = ReduceBins(dataIth, ExpressionNames, EventsSorted, BinWidth,
+                           Statistics)
+
+    AddPhase(Phases, "Reduce", Start, len(dataIth))
+
+    return Means
+
+
+def ReduceFileTimed(path, ColumnNames, ExpressionNames, EventsSorted,
+                    Types = None, Statistics = None, BinWidth = None,
+                    InputCache = None, Runs = None, ProfileFile = None):
+
+    #Reduce one file (function ReduceFile) and return the means together with
+    #the phases of the file (see file "Instrumentation.py"). If ProfileFile is
+    #specified, the file is reduced under the Python profiler and the
+    #statistics are written to ProfileFile.
+
+    Phases = {}
+
+    Start = time.perf_counter()
+
+    #Functions defined in Instrumentation.py
+    Means = RunProfiled(ProfileFile, ReduceFile, path, ColumnNames,
+                        ExpressionNames, EventsSorted, Types, Statistics,
+                        BinWidth, InputCache, Runs, Phases)
+
+    AddParticipant(Phases, Start)
+
+    return [Means, Phases]
+
+
+def AggregateInsert(Means, Row, ExpressionNames, AggregateTable,
+                    Statistics = None):
+
+    #Insert the statistics of one file (from function ReduceData) into the
+    #aggregation table. The rows of a file are consecutive, one per event, and
+    #start at row Row (see function SetupTable); therefore, the rows do not
+    #need to be searched for.
+
+    #Function defined above
+    Cols = AggregateTable.columns.get_indexer(
+               StatisticColumns(ExpressionNames, Statistics))
+
+    AggregateTable.iloc[Row : Row + Means.shape[0], Cols] = Means
+
+
+    return AggregateTable
+
+
+########################################
+##### Define function to aggregate #####
+########################################
+
+def AggregateToTable(pathsArrayStr, ExpressionNames, ColumnNames, 
+                     EventsSorted, NEvents, AggregateTable, filesArrayStr,
+                     Jobs = 1, RunsByID = None, Types = None,
+                     WriteRecord = None, ProfileFiles = None,
+                     Statistics = None, BinWidth = None, InputCache = None):
+
+    #WriteRecord, if specified, is a function that writes a log record (see
+    #function OpenLog in "Instrumentation.py"). ProfileFiles, if specified,
+    #holds for each file the file to which to write the statistics of the
+    #Python profiler, or None.
+      
+    print("\nAggregating...")  
+
+    #Arguments that are the same for every file
+    Args = (ColumnNames, ExpressionNames, EventsSorted, Types, Statistics,
+            BinWidth, InputCache)
+
+    #Rows of each event of each file, if aggregating from an event index
+    if RunsByID is None:
+
+        RunsByID = [None] * pathsArrayStr.size
+
+    if ProfileFiles is None:
+
+        ProfileFiles = [None] * pathsArrayStr.size
+
+    Progress = {"Start": time.perf_counter(), "Rows": 0, "Done": 0,
+                "Total": pathsArrayStr.size}
+
+    #One file at a time
+    if Jobs == 1:
+
+        #Function defined above
+        Results = (ReduceFileTimed(path, *Args, Runs, ProfileFile)
+                   for path, Runs, ProfileFile in
+                   zip(pathsArrayStr, RunsByID, ProfileFiles))
+
+    #Files distributed across a pool of processes
+    #Each process reduces a file to a small array of means, which is merged
+    #into the aggregation table below. The arguments that are the same for
+    #every file are passed once to each process (by function SetupWorker).
+    #Results are returned in the order of filesArrayStr.
+    else:
+
+        Pool = ProcessPoolExecutor(max_workers = Jobs,
+                                   initializer = SetupWorker,
+                                   initargs = Args)
+
+        #Function defined below
+        Results = \
+            Pool.map(ReduceWorker, pathsArrayStr, RunsByID, ProfileFiles,
+                     chunksize = 1)
+        
+    #First row of each file in the aggregation table
+    RowOffsets = np.arange(filesArrayStr.size) * NEvents
+
+    #Tables of the bins of each file, if binned
+    #As the number of bins differs between files, the tables are
+    #concatenated rather than inserted into the preallocated table.
+    BinTables = []
+
+    #Loop across files
+    for fileIth, Row, (Means, Phases) in \
+        zip(filesArrayStr, RowOffsets, Results):
+
+        print("..." + fileIth)
+
+        #Function defined in Instrumentation.py
+        if WriteRecord != None:
+
+            LogParticipant(WriteRecord, "Aggregate", fileIth, Phases,
+                           Progress)
+
+        #Merge means of file into table
+        #Function defined above.
+        if BinWidth == None:
+
+            AggregateTable = \
+                AggregateInsert(Means, Row, ExpressionNames, AggregateTable,
+                                Statistics)
+
+        else:
+
+            Means.insert(0, "ID", fileIth)
+
+            BinTables.append(Means)
+
+    if Jobs != 1:
+
+        Pool.shutdown()
+
+    #Function defined below
+    if BinWidth != None:
+
+        AggregateTable = ConcatBins(BinTables, filesArrayStr, EventsSorted,
+                                    ExpressionNames, Statistics)
+
+    
+    return AggregateTable
+
+
+def ConcatBins(BinTables, filesArrayStr, EventsSorted, ExpressionNames,
+               Statistics = None):
+
+    #Concatenate the tables of the bins of each file (from function
+    #ReduceBins) into the aggregation table
+
+    if len(BinTables) == 0:
+
+        return pd.DataFrame(columns = ["ID", "Event", "Bin"] + \
+                            StatisticColumns(ExpressionNames, Statistics))
+
+    AggregateTable = pd.concat(BinTables, ignore_index = True)
+
+    AggregateTable["ID"] = \
+        pd.Categorical(AggregateTable.ID, categories = filesArrayStr)
+
+    AggregateTable["Event"] = \
+        pd.Categorical(AggregateTable.Event, categories = EventsSorted)
+
+
+    return AggregateTable
+
+
+#Arguments that are the same for every file, set once in each worker process
+#of a process pool by function SetupWorker
+WorkerArgs = None
+
+def SetupWorker(*Args):
+
+    global WorkerArgs
+
+    WorkerArgs = Args
+
+
+def ReduceWorker(path, Runs = None, ProfileFile = None):
+
+    #Reduce one file in a worker process
+    return ReduceFileTimed(path, *WorkerArgs, Runs, ProfileFile)
+
+
+#####################################################################
+##### Define function to aggregate data sets that are in memory #####
+#####################################################################
+
+def AggregateFrames(Frames, ExpressionNames, AggregateFile = None,
+                    Statistics = None, Layout = "wide", BinWidth = None):
+
+    #Aggregate annotated iMotions data sets that are already in memory and
+    #return the aggregation table, which is also written to AggregateFile,
+    #if specified. Frames is an iterable of (ID, Data) pairs, e.g., the
+    #iterator returned by function AnnotateFrames (see file "Annotate.py"),
+    #which is consumed one data set at a time, so that only one data set
+    #needs to be held in memory. Column "Event" of each data set must be
+    #categorical, with the events in chronological order as its categories,
+    #as inserted by function InsertEvents (see file "Annotate.py"). The other
+    #arguments, and the aggregation table, are as in function Aggregate.
+    #Data sets for which an error occurs are skipped with a message; their
+    #rows of the table are empty.
+
+    #Example:
+
+    #AggregateTable = \
+    #    AggregateFrames(AnnotateFrames(ExcelFile, InputDataFolder),
+    #                    ExpressionNames)
+
+    assert( type(ExpressionNames) == list and len(ExpressionNames) != 0 and \
+            all(type(i) == str for i in ExpressionNames) ), \
+    "Error in AggregateFrames: ExpressionNames must be a list of one or more" \
+    " str elements."
+
+    assert( AggregateFile == None or \
+            (type(AggregateFile) == str and AggregateFile[-3:] == "csv") ), \
+    "Error in AggregateFrames: AggregateFile must be None or type str with" \
+    " file extension '.csv'."
+
+    #Function defined above
+    ValidateAggregation("AggregateFrames", Statistics, Layout, BinWidth)
+
+    #IDs of the data sets, the statistics of each data set (None if an
+    #error occurred), and the events in chronological order (from the first
+    #data set)
+    IDs          = []
+    MeansByID    = []
+    EventsSorted = None
+
+    for ID, Data in Frames:
+
+        ID = str(ID)
+
+        #Progress notification
+        print("..." + ID)
+
+        IDs.append(ID)
+
+        MeansByID.append(None)
+
+        #Functions defined above
+        try:
+
+            assert( isinstance(Data.Event.dtype, pd.CategoricalDtype) ), \
+            "Column Event must be categorical"
+
+            if EventsSorted == None:
+
+                EventsSorted = list(Data.Event.cat.categories)
+
+            assert( list(Data.Event.cat.categories) == EventsSorted ), \
+            "The events of column Event differ from those of the first data" \
+            " set"
+
+            if BinWidth == None:
+
+                Means = ReduceData(Data, ExpressionNames, EventsSorted,
+                                   Statistics)
+
+            else:
+
+                Means = ReduceBins(Data, ExpressionNames, EventsSorted,
+                                   BinWidth, Statistics)
+
+                Means.insert(0, "ID", ID)
+
+            MeansByID[-1] = Means
+
+        except Exception as e:
+
+            #Function defined in Annotate.py
+            print(ErrorMessage(ID, e))
+
+        #The data set is released before the next one is produced
+        Data = None
+
+    assert( EventsSorted != None ), \
+    "Error in AggregateFrames: Frames did not contain any data set that" \
+    " could be aggregated."
+
+    ColumnNames = ["Event"] + ExpressionNames
+
+    filesArrayStr = np.array(IDs)
+
+    #Insert the statistics of each data set into the table
+    #Functions defined above.
+    if BinWidth == None:
+
+        AggregateTable = \
+            SetupTable(filesArrayStr, EventsSorted, ColumnNames, Statistics)
+
+        for i, Means in enumerate(MeansByID):
+
+            if not (Means is None):
+
+                AggregateTable = \
+                    AggregateInsert(Means, i * len(EventsSorted),
+                                    ExpressionNames, AggregateTable,
+                                    Statistics)
+
+    else:
+
+        AggregateTable = \
+            ConcatBins([i for i in MeansByID if not (i is None)],
+                       filesArrayStr, EventsSorted, ExpressionNames,
+                       Statistics)
+
+    AggregateTable = \
+        FinishTable(AggregateTable, ExpressionNames, Statistics, Layout)
+
+    if AggregateFile != None:
+
+        AggregateTable.to_csv(AggregateFile,
+                              index = False) #No row index (default is True)
+
+        print("\nFile written to " + AggregateFile + ".\n")
+
+
+    return AggregateTable
+
+
+#########################################################
+##### Define function to merge the tables of shards #####
+#########################################################
+
+def MergeAggregates(AggregateFiles, AggregateFile):
+
+    #Merge the aggregation tables of several shards (files AggregateFiles,
+    #each written by function Aggregate with argument Shard, e.g., on a
+    #separate machine) into one aggregation table, written to AggregateFile.
+    #The merged table is the same as the one that function Aggregate writes
+    #for all participants at once: the rows of each participant, with the
+    #events in chronological order, are kept as they are, and the
+    #participants are in the order of their IDs (see function IDOrder in
+    #"DataFiles.py"). The values are copied as text, so they are not rounded
+    #again. The table of a shard without participants has the column names
+    #only and adds no rows.
+
+    #Example:
+
+    #MergeAggregates(['C:/Users/User1/Documents/AggTable_' + str(k) + '.csv'
+    #                 for k in range(1, 9)],
+    #                'C:/Users/User1/Documents/AggTable.csv')
+
+    assert( type(AggregateFiles) == list and len(AggregateFiles) != 0 and \
+            all(type(i) == str for i in AggregateFiles) ), \
+    "Error in MergeAggregates: AggregateFiles must be a list of one or more" \
+    " str elements."
+
+    assert( type(AggregateFile) == str and AggregateFile[-3:] == "csv" ), \
+    "Error in MergeAggregates: AggregateFile must be type str with file" \
+    " extension '.csv'."
+
+    for i in AggregateFiles:
+
+        assert( exists(i) ), \
+        "Error in MergeAggregates: File " + i + " does not appear to exist."
+
+    #Every value is read as text, as written
+    Tables = [pd.read_csv(i, dtype = str, keep_default_na = False)
+              for i in AggregateFiles]
+
+    assert( all(list(i.columns) == list(Tables[0].columns)
+                for i in Tables) ), \
+    "Error in MergeAggregates: The tables of AggregateFiles must have the" \
+    " same columns (e.g., the same ExpressionNames, Statistics, Layout, and" \
+    " BinWidth)."
+
+    #Each participant must be in only one table
+    IDs = [pd.unique(i.ID) for i in Tables]
+
+    AllIDs = np.concatenate(IDs)
+
+    assert( len(set(AllIDs)) == AllIDs.size ), \
+    "Error in MergeAggregates: The same ID appears in more than one of" \
+    " AggregateFiles; the tables must be of different shards."
+
+    AggregateTable = pd.concat(Tables, ignore_index = True)
+
+    #Participants in the order of their IDs; the rows of a participant are
+    #kept in their order (a stable sort)
+    #Function defined in DataFiles.py.
+    Rank = np.empty(AllIDs.size, dtype = np.int64)
+
+    Rank[IDOrder(AllIDs)] = np.arange(AllIDs.size)
+
+    Rank = pd.Series(Rank, index = AllIDs)
+
+    AggregateTable = \
+        AggregateTable.iloc[
+            np.argsort(Rank[AggregateTable.ID].to_numpy(), kind = "stable")]
+
+    AggregateTable.to_csv(AggregateFile,
+                          index = False) #No row index (default is True)
+
+
+    ##### Completion message #####
+
+    print("\nMerge of " + str(len(AggregateFiles)) + " aggregation tables" + \
+          " completed.\nFile written to " + AggregateFile + ".\n")
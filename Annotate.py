@@ -7,6 +7,16 @@ Summary
 Function file for function Annotate. This file is intended to be called by 
 script "StartHere_Script.py". See this script for details.
 
+The steps of function Annotate are also defined as separate functions in this
+file (SetupAnnotations, ReadiMotions, InsertEvents, and AnnotateInsert) so
+that they can be reused by function AnnotateAggregate (see file
+"AnnotateAggregate.py").
+
+Function AnnotateFrames (see the end of this file) annotates the iMotions data
+files in memory, without writing any file, and returns the annotated data
+sets one participant at a time, e.g., for use in a notebook or to be passed
+to function AggregateFrames (see file "Aggregate.py").
+
 
 Inputs
 ------
@@ -34,6 +44,234 @@ Inputs
                            
                        OutputDataFolder = \
                            'C:/Users/User1/Documents/iMotionsOutputs'   
+
+    Jobs             = Optional. Number of participants to annotate at the
+                       same time, each in a separate process. The default, 1,
+                       annotates participants one at a time in the current
+                       process. Class int.
+
+                       Example:
+
+                       Jobs = os.cpu_count()
+
+                       Note: on Windows, when Jobs is greater than 1, the
+                       call to Annotate must be placed under
+                       "if __name__ == '__main__':" in the calling script.
+
+    ChunkSize        = Optional. If specified, each iMotions data file is
+                       read, annotated, and written ChunkSize rows at a time
+                       rather than all at once. Memory use then depends on
+                       ChunkSize rather than on the size of the file, which
+                       allows files larger than the available memory to be
+                       annotated. The annotated files are the same either
+                       way. The default, None, reads each file all at once.
+                       Class int.
+
+                       Example:
+
+                       ChunkSize = 100000
+
+    OutputFormat     = Optional. Format of the annotated iMotions data files:
+                       "csv" (default), "parquet", or "feather". The binary
+                       formats ("parquet" and "feather") store column "Event"
+                       as a dictionary-encoded column, are faster to write and
+                       read, and allow function Aggregate to read only the
+                       columns it needs. They require package PyArrow (see
+                       "DataFiles.py"). The file of a participant written
+                       earlier in another format is removed. Class str.
+
+                       Example:
+
+                       OutputFormat = "parquet"
+
+    Compression      = Optional. Codec with which to compress the annotated
+                       iMotions data files. For csv files, "gzip" or "zstd"
+                       (which requires package zstandard); the files then
+                       have a second extension (".csv.gz" or ".csv.zst").
+                       For parquet files, "snappy" (the default for
+                       parquet), "gzip", "zstd", or "lz4". For feather files,
+                       "zstd" or "lz4". Function Aggregate reads compressed
+                       files as is. The file of a participant written
+                       earlier with another compression is removed. The
+                       default, None, does not compress csv and feather
+                       files. Class str.
+
+                       Example:
+
+                       Compression = "zstd"
+
+    NEvents          = Optional. Number of events, i.e., of columns of the
+                       Excel annotations file, starting at "Webcam Start.1"
+                       (or "Webcam Start"), that hold the start times of the
+                       events. The default is 11. Class int.
+
+                       Example:
+
+                       NEvents = 11
+
+    EventIndex       = Optional. If specified, annotated iMotions data files
+                       are not written. Instead, only column "MediaTime" of
+                       each iMotions data file is read, and an event index
+                       is written that lists the rows of the original file
+                       that belong to each event (see "DataFiles.py"). The
+                       event index is much smaller than the annotated data
+                       and is written much faster; function Aggregate reads
+                       it together with the original iMotions data files.
+                       "participant" writes one event index file per
+                       participant (e.g., "4001.events.csv"); "study" writes
+                       one event index file for all participants
+                       ("EventIndex.csv"). The default, None, writes
+                       annotated iMotions data files. OutputFormat is ignored
+                       if EventIndex is specified. Class str.
+
+                       Example:
+
+                       EventIndex = "study"
+
+    KeepColumns      = Optional. List of the columns of the iMotions data
+                       files to keep in the annotated iMotions data files.
+                       Only these columns are read, which is faster than
+                       reading all columns. Column "MediaTime" is always
+                       kept, and column "Event" is always inserted. The
+                       default, None, keeps all columns. Ignored if
+                       EventIndex is specified. Class list of str.
+
+                       Example:
+
+                       KeepColumns = ['Anger', 'Sadness', 'Disgust', 'Joy',
+                       'Surprise', 'Fear', 'Contempt']
+
+    TrimRows         = Optional. If True, rows that do not belong to any
+                       event are not written to the annotated iMotions data
+                       files, i.e., rows before "Webcam Start" and rows
+                       without a valid MediaTime. Aggregation is not affected
+                       as these rows are not aggregated. The default, False,
+                       writes all rows. Class bool.
+
+                       Example:
+
+                       TrimRows = True
+
+    Incremental      = Optional. If True (default), participants whose
+                       annotated iMotions data file (or event index file) is
+                       already up to date are skipped. A manifest
+                       ("Manifest.json") is kept in OutputDataFolder that
+                       records, for each participant, the size and
+                       modification time of the iMotions data file, the
+                       participant's start times in the Excel annotations
+                       file, the settings used (e.g., OutputFormat, and the
+                       engine used to read text files), and the size and
+                       modification time of the file written. A participant
+                       is processed again if any of these has changed, if the
+                       file written has been changed or removed, or if an
+                       error occurred the last time. The manifest is updated
+                       after each participant, so a run that was interrupted
+                       continues where it stopped. If False, all
+                       participants are processed. Participants are always
+                       processed if EventIndex is "study", as the event index
+                       file is then combined from all participants. Class
+                       bool.
+
+                       Example:
+
+                       Incremental = False
+
+    Float32          = Optional. If True, the expression columns of the
+                       iMotions data files (see ExpressionColumns in
+                       "DataFiles.py") are read as 32-bit rather than 64-bit
+                       floating point numbers, which halves the memory they
+                       use. MediaTime is always read as a 64-bit number. The
+                       default is False. Class bool.
+
+                       Example:
+
+                       Float32 = True
+
+    Dtypes           = Optional. Dict of column names and types, which
+                       override the known types of the columns of iMotions
+                       data files (see iMotionsColumnTypes in "DataFiles.py").
+                       Columns of unknown type are inferred when read. The
+                       default, None, uses the known types. Class dict.
+
+                       Example:
+
+                       Dtypes = {'Smile': 'float32', 'Gender': 'category'}
+
+    Log              = Optional. Full path of a file to which the elapsed
+                       time, rows, and bytes of each phase (e.g., reading,
+                       annotating, and writing) of each participant are
+                       appended as JSON lines, together with the peak memory,
+                       the rows per second so far, and the estimated time
+                       until all participants are annotated (see
+                       "Instrumentation.py"). Alternatively, a function that
+                       is called with each record (a dict). The default,
+                       None, records nothing. Class str or function.
+
+                       Example:
+
+                       Log = 'C:/Users/User1/Documents/AnnotateLog.jsonl'
+
+    Profile          = Optional. ID of a participant to annotate under the
+                       Python profiler (cProfile). The statistics are written
+                       to file "Profile_<ID>.prof" in OutputDataFolder and
+                       can be read with module pstats. The default, None,
+                       profiles no participant. Class int or str.
+
+                       Example:
+
+                       Profile = 4001
+
+    Pipeline         = Optional. If greater than 0, participants are
+                       annotated in a pipeline in the current process: while
+                       one participant is being annotated, the iMotions data
+                       files of up to Pipeline next participants are read on
+                       a background thread, and the annotated files of up to
+                       Pipeline previous participants are written on another
+                       background thread. Reading and writing, e.g., on a
+                       network drive, then overlap with annotating. At most
+                       about 2 * Pipeline + 2 participants are held in memory
+                       at the same time. Requires Jobs to be 1, ChunkSize to
+                       be None, and Profile to be None. The annotated files
+                       are the same either way. The default, 0, reads,
+                       annotates, and writes one participant at a time.
+                       Class int.
+
+                       Example:
+
+                       Pipeline = 2
+
+    InputCache       = Optional. Full path of a folder in which to cache the
+                       iMotions data files in a binary form (see
+                       "DataFiles.py"). The first time a file is read, all of
+                       its columns are parsed and written to the cache; the
+                       next times (e.g., after the Excel annotations file is
+                       changed), the cached columns are memory-mapped instead
+                       of parsing the text again. A file is cached again if
+                       its size or modification time changes. The data read
+                       are the same either way. The cache is not used if
+                       ChunkSize is specified. The default, None, does not
+                       cache. Class str.
+
+                       Example:
+
+                       InputCache = 'C:/Users/User1/Documents/iMotionsCache'
+
+    Shard            = Optional. If specified, only the participants of shard
+                       Shard are annotated, where Shard is "k/n", the kth of n
+                       shards (k from 1 to n). Each participant belongs to
+                       one shard, determined by its ID (see "DataFiles.py"),
+                       so running shards "1/n" to "n/n", e.g., on n machines,
+                       annotates every participant once. Shards that run at
+                       the same time should write to different
+                       OutputDataFolder folders. The aggregation table of
+                       each shard (see argument Shard of function Aggregate)
+                       can be merged with function MergeAggregates (see
+                       "Aggregate.py"). The default, None, annotates all
+                       participants. Class str.
+
+                       Example:
+
+                       Shard = '2/8'
                        
                        
 Requires
@@ -42,6 +280,10 @@ Requires
 - Python 3
 - Pandas 
 - NumPy
+- openpyxl
+- DataFiles.py (custom file)
+- Instrumentation.py (custom file)
+- PyArrow (optional; only if OutputFormat is "parquet" or "feather")
 
 
 Author
@@ -54,17 +296,41 @@ Suarez Behavioral Labs, College of Business, The University of Akron
 
 """  
 
-def Annotate(ExcelFile, InputDataFolder, OutputDataFolder):
+##### Import packages #####
+
+import pandas as pd      
+import numpy as np
+from pathlib import Path
+from os.path import exists, getsize
+from os import remove, replace, stat
+import json
+import datetime
+import openpyxl
+import hashlib
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+
+#The module itself is imported to read its current CsvEngine, which can be
+#changed after import
+import DataFiles
+from DataFiles import WriteData, CloseWriter, EventIndexExtension, \
+                      EventIndexFile, WriteEventOrder, ColumnTypes, \
+                      DataFileName, ReadTable, ReadTableCached, IsShard, \
+                      InShard, ValidateOutputFormat, FloatPrecision, \
+                      RemoveDataFiles
+from Instrumentation import AddPhase, AddParticipant, RunProfiled, OpenLog, \
+                            LogPhases, LogParticipant
+
+
+def Annotate(ExcelFile, InputDataFolder, OutputDataFolder, Jobs = 1,
+             ChunkSize = None, OutputFormat = "csv", EventIndex = None,
+             KeepColumns = None, TrimRows = False, Incremental = True,
+             Float32 = False, Dtypes = None, Compression = None,
+             NEvents = 11, Log = None, Profile = None, Pipeline = 0,
+             InputCache = None, Shard = None):
         
-    ##### Import packages #####
-    
-    import pandas as pd      
-    import numpy as np
-    from pathlib import Path
-    from os.path import exists 
-    import re
-      
-    
     ##### Argument validation #####
         
     #Verify types:
@@ -74,6 +340,61 @@ def Annotate(ExcelFile, InputDataFolder, OutputDataFolder):
             type(OutputDataFolder) == str), \
     "Error in Annotate: ExcelFile, InputDataFolder, and OutputDataFolder" \
     " must be type str."
+
+    assert( type(Jobs) == int and Jobs >= 1 ), \
+    "Error in Annotate: Jobs must be an integer of 1 or greater."
+
+    assert( ChunkSize == None or \
+            (type(ChunkSize) == int and ChunkSize >= 1) ), \
+    "Error in Annotate: ChunkSize must be None or an integer of 1 or greater."
+
+    #Function defined in DataFiles.py
+    ValidateOutputFormat("Annotate", OutputFormat, Compression)
+
+    assert( EventIndex in [None, "participant", "study"] ), \
+    "Error in Annotate: EventIndex must be None, 'participant', or 'study'."
+
+    assert( KeepColumns == None or \
+            (type(KeepColumns) == list and \
+             all(type(i) == str for i in KeepColumns)) ), \
+    "Error in Annotate: KeepColumns must be None or a list of str elements."
+
+    assert( type(TrimRows) == bool ), \
+    "Error in Annotate: TrimRows must be type bool."
+
+    assert( type(Incremental) == bool ), \
+    "Error in Annotate: Incremental must be type bool."
+
+    assert( type(Float32) == bool ), \
+    "Error in Annotate: Float32 must be type bool."
+
+    assert( type(NEvents) == int and NEvents >= 1 ), \
+    "Error in Annotate: NEvents must be an integer of 1 or greater."
+
+    assert( Dtypes == None or \
+            (type(Dtypes) == dict and all(type(i) == str for i in Dtypes)) ), \
+    "Error in Annotate: Dtypes must be None or a dict with str keys."
+
+    assert( Log == None or type(Log) == str or callable(Log) ), \
+    "Error in Annotate: Log must be None, type str, or a function."
+
+    assert( Profile == None or type(Profile) in [int, str] ), \
+    "Error in Annotate: Profile must be None or type int or str."
+
+    assert( type(Pipeline) == int and Pipeline >= 0 ), \
+    "Error in Annotate: Pipeline must be an integer of 0 or greater."
+
+    assert( Pipeline == 0 or \
+            (Jobs == 1 and ChunkSize == None and Profile == None) ), \
+    "Error in Annotate: Pipeline requires Jobs to be 1, ChunkSize to be None," \
+    " and Profile to be None."
+
+    assert( InputCache == None or type(InputCache) == str ), \
+    "Error in Annotate: InputCache must be None or type str."
+
+    assert( Shard == None or IsShard(Shard) ), \
+    "Error in Annotate: Shard must be None or a str 'k/n', where k and n are" \
+    " integers and k is from 1 to n."
            
     #Verify full directories were entered:
  
@@ -142,102 +463,34 @@ def Annotate(ExcelFile, InputDataFolder, OutputDataFolder):
         InputDataFolder = InputDataFolder[:-2]
   
 
-    #################################################################
-    ##### Import and modify Excel sheet containing timestamps #######
-    #################################################################
+    ###############################################################
+    ##### Import and modify Excel sheet containing timestamps #####
+    ###############################################################
     
-    #Import Excel file with the timestamps that correspond to the start  
-    #times of events.
-    #E.g., for participant 4001, the first task begins at 10:41 AM and the 
-    #second task begins at 10:49 AM.
-    Annotations = \
-        pd.read_excel(ExcelFile)
-     
-    ##### Select columns to use for annotations ######
+    #The compiled annotations are cached in OutputDataFolder
+    #Function defined below.
+    SetupPhases = {}
+
+    Start = time.perf_counter()
+
+    Out = SetupAnnotations(ExcelFile, OutputDataFolder, NEvents)
+
+    #Function defined in Instrumentation.py
+    AddPhase(SetupPhases, "SetupAnnotations", Start)
+
+    Annotations     = Out[0]
+    HeadingList     = Out[1]
+    HeadingListAnnt = Out[2]
+    ParticipantID   = Out[3]
+
+    #Participants of the shard, if any
+    #Function defined in DataFiles.py.
+    ParticipantID = ParticipantID[InShard(ParticipantID, Shard)]
+
 
-    #Start at either column "Webcam Start.1" or "Webcam Start" 
-    #Note: there may be two columns with the heading "Webcam Start". If two,   
-    #the second will be automatically relabelled "Webcam Start.1" when  
-    #imported. If there are two, use the second column ("Webcam Start.1"). 
-    FirstColumnLabel = "Webcam Start.1"
-    
-    if not any(Annotations.columns == "Webcam Start.1"):
-        
-        FirstColumnLabel = "Webcam Start"
-       
-    #Determine the index of the starting column
-    Idx = Annotations.columns.get_loc(FirstColumnLabel)
-    
-    #Vector of columns labels to be used
-    #These columns correspond to the 11 events, each of which represents an 
-    #annotation. Start at "Webcam Start.1" (or "Webcam Start"). 
-    HeadingList = Annotations.columns[range(Idx, Idx + 11)]
-          
-    ##### Modify elements in HH:MM:SS format to millisecond format #####
-    
-    #Modify the format of elements in the columns to be used from HH:MM:SS 
-    #format to millisecond format. This will match the format of the iMotions 
-    #data sets, allowing annotations to be added to the iMotions data sets 
-    #later. 
-    #Note: each element represents the start time of the event by participant. 
-    
-    #Loop across columns to be used
-    for i in range(0, len(HeadingList)):
-        
-        #Extract column
-        Col = Annotations.loc[:, HeadingList[i]].copy(deep = False)   
-        
-        #Loop across rows 
-        for j in range(0, len(Col)): 
-            
-            #If a HH:MM:SS element present
-            #Determined by checking whether a datetime.time type is present.
-            if str(type(Col[j])) == "<class 'datetime.time'>":
-            
-                #Convert HH:MM:SS to milliseconds
-                #Type int.
-                Col[j] = \
-                    (Col[j].hour * 60 * 60 + \
-                     Col[j].minute * 60 + \
-                     Col[j].second) * \
-                    1000
-            
-            #If not, the element may be blank or have another non-time entry
-            else:
-                
-                #Overwrite with NaN
-                #Type float.
-                Col[j] = np.nan
-         
-        #Overwrite column
-        Annotations.loc[:, HeadingList[i]] = Col
-               
-    ##### Adjust milliseconds to start at webcam start #####    
-    
-    #In other words, milliseconds will equal time elapsed since webcam start 
-    #rather than equal clock time. Doing so will make the format of the start 
-    #times correspond to the format of iMotions data. 
-       
-    #Vector of webcam start times
-    #Note: it is necessary to use a "deep copy".   
-    WebcamStart = Annotations.loc[:, "Webcam Start.1"].copy(deep = True)
-        
-    #Loop across start columns
-    for i in range(0, len(HeadingList)):
-        
-        #Extract column
-        Col = Annotations.loc[:, HeadingList[i]].copy(deep = False)
-        
-        #Subtract webcam start time to receive elapsed time
-        TimeFromStart = Col - WebcamStart
-        
-        #Overwrite column with adjusted time
-        Annotations.loc[:, HeadingList[i]] = TimeFromStart
-    
-        
     #############################################
     ##### Import and annotate iMotions data #####
-    #############################################   
+    #############################################
     
     #Insert a column labeled "Event" into each iMotions data set. This column 
     #will hold all annotations to be inserted. Note that there is a separate  
@@ -261,177 +514,1580 @@ def Annotate(ExcelFile, InputDataFolder, OutputDataFolder):
     #Requires function Path.
     Path(OutputDataFolder).mkdir(parents = True, exist_ok = True) 
 
-    ##### Determine participants to loop through #####       
-        
-    #This is determined based upon the entries in the Excel annotations 
-    #file in column 'Participant #'. Later, the folder specified by 
-    #InputDataFolder will be inspected for iMotions data files that match the 
-    #ID found in this column. For each matching file found, an output file will 
-    #be written. 
-  
-    #Preallocate participant ID vector
-    ParticipantID = np.zeros(Annotations.index.stop, dtype = int)
-    
-    #Only retain participant IDs that are integers
-    #This is intended to exclude blank rows, strings, or other non-ID entries. 
-    for i in range(0, Annotations.index.stop):
-        
-        El = Annotations.loc[i, 'Participant #']
-        
-        #If an integer type
-        if type(El) == int:
-        
-            ParticipantID[i] = El
-    
-    #Remove unfilled (i.e., preallocated as zero) or non-unique rows        
-    ParticipantID = np.unique( ParticipantID[ParticipantID != 0] )   
-    
-    ##### Specify annotation text #####
-    
-    #As mentioned previously, the annotation text is the same as the column
-    #headers. However, if "Webcam Start.1" is present rather than 
-    #"Webcam Start", use "Webcam Start" instead as this is the text used in the 
-    #Excel annotations file.
-    
-    HeadingListAnnt = list(HeadingList)
-    HeadingListAnnt[0] = "Webcam Start"      
-  
-    ##### Define function to annotate iMotions data files #####
-    
-    def AnnotateInsert(i, InputDataFolder, Annotations, HeadingList,  
-                 HeadingListAnnt, OutputDataFolder):         
-            
-        #Import txt file with iMotions data: 
-       
-        #File name of an iMotions data set
-        path = ''.join([InputDataFolder, "/", str(i), ".txt"])
-      
-        #If the specified data file exists
-        #Requires function "exists".
-        if exists(path):
-            
-            #Read data
-            Data = \
-                pd.read_table(path,
-                              sep = '\t', 
-                              skiprows = 5, #to read the data correctly 
-                              memory_map = True) #Import into memory   
-                                                 #for decreased I/O  
-                                                 #(default false).
-             
-            #Confirm that column "MediaTime" is present in file
-            assert( any(Data.columns == "MediaTime") ), \
-            "Error in Annotate: Column 'MediaTime', which is required, not" \
-            " present in iMotions input file " + str(path)                                                  
-             
-            #Insert column for event labels
-            Data.insert(
-                loc = 1, #column index
-                column = 'Event', #column label
-                value = '') #values              
-            
-            ##### Loop across columns of times to insert annotation #####    
-        
-            #Vector of time (and other columns) for the ith participant 
-            #from the annotation Excel file.
-            #Deep copy to avoid reindexing.
-            LogIdx_IDith = Annotations.loc[:, "Participant #"] == i #log index 
-            Times_IDith = \
-                Annotations.loc[LogIdx_IDith, :].copy(deep = True) 
-        
-            #Vector time from iMotions data
-            #Deep copy to avoid reindexing.
-            MediaTime = Data.loc[:, 'MediaTime'].copy(deep = True)
-            
-            #Initalize time of previous column
-            tOld = int(0)            
-        
-            #Loop across columns in iMotions data set
-            for j in range(1, len(HeadingList)):           
-           
-                #Start time of jth column and j + 1th column
-                t = Times_IDith.loc[:, HeadingList[j]].copy(deep = True)     
-                
-                #Convert start time from pandas series to integer for 
-                #comparison.
-                t = t.reset_index(drop = True) #start dataframe index at 0
-                t = t[0] #extract as integer
-            
-                #Logical index of timestamps for previous condition 
-                #(Greater than start time of previous condition and   
-                #less than start time of current condition).
-                LogIdx = MediaTime.ge(tOld) & MediaTime.le(t) 
-                
-                #Insert label for previous condition to "Event" column
-                Data.loc[LogIdx, 'Event'] = \
-                    HeadingList[j - 1]                               
-                    
-                #If the final column
-                if j == len(HeadingList) - 1: 
-                    
-                    #Logical index of timestamps for current condition
-                    LogIdx = MediaTime.ge(t)    
-                    
-                    #Insert label for current condition to "Event" 
-                    #column.
-                    Data.loc[LogIdx, 'Event'] = \
-                        HeadingList[j]   
-                
-                #Assign time of current column as time of previous 
-                #column for the next iteration.
-                tOld = t 
-                                                  
-            ##### Write dataframe to csv file #####  
-            
-            #File name for annotated data set
-            OutputDataFile = \
-                ''.join([OutputDataFolder, "/", str(i), ".csv"])
-            
-            #Write data file with annotations
-            Data.to_csv(OutputDataFile)
+    #Write the events in chronological order, for function Aggregate
+    #Function defined in DataFiles.py.
+    WriteEventOrder(OutputDataFolder, HeadingList)
+
+    ##### Determine participants that are up to date #####
+
+    #Manifest of the previous runs
+    #Function defined below.
+    ManifestFile = OutputDataFolder + "/" + ManifestName
+
+    Manifest = ReadManifest(ManifestFile)
+
+    #Settings that determine the content of the file written
+    Settings = {"OutputFormat": OutputFormat,
+                "Compression":  Compression,
+                "EventIndex":   EventIndex,
+                "KeepColumns":  KeepColumns,
+                "TrimRows":     TrimRows,
+                "Float32":      Float32,
+                "Dtypes":       None if Dtypes == None else \
+                                {i: str(Dtypes[i]) for i in Dtypes},
+                "HeadingList":  list(HeadingList),
+                "CsvEngine":    DataFiles.CsvEngine}
+
+    #Current state of the inputs of each participant
+    #Function defined below.
+    Entries = {str(i): ManifestEntry(i, InputDataFolder, Annotations,
+                                     Settings)
+               for i in ParticipantID}
+
+    #Participants whose file does not need to be written again
+    #Function defined below.
+    UpToDate = \
+        [i for i in ParticipantID
+         if Incremental and EventIndex != "study" and \
+            IsUpToDate(Entries[str(i)], Manifest.get(str(i)),
+                       OutputDataFolder)]
+
+    #Participants to process
+    ProcessID = [i for i in ParticipantID if i not in UpToDate]
 
-        #If the specified data file does not exist
-        else:
-            
-            #Display message
-            message = \
-                ''.join(["...iMotions data file not present for ID ", \
-                         str(i), ".", \
-                         " Skipping to next file."])    
-                
-            print(message)             
-                  
     ##### Loop through participant data sets and add annotations #####      
             
     print("Annotating...")  
-    
-    for i in ParticipantID:  
-  
+
+    #Types of the columns of the iMotions data files
+    #Function defined in DataFiles.py.
+    Types = ColumnTypes(Dtypes, Float32)
+
+    #Arguments that are the same for every participant
+    Args = (InputDataFolder, Annotations, HeadingList, HeadingListAnnt,
+            OutputDataFolder, ChunkSize, OutputFormat, EventIndex,
+            KeepColumns, TrimRows, Types, Compression, InputCache)
+
+    #File of the statistics of the participant to profile, if any
+    ProfileFiles = \
+        [OutputDataFolder + "/Profile_" + str(i) + ".prof"
+         if Profile != None and str(i) == str(Profile) else None
+         for i in ProcessID]
+
+    #Log of the phases of each participant
+    #Functions defined in Instrumentation.py.
+    WriteRecord = OpenLog(Log)
+
+    if WriteRecord != None:
+
+        LogPhases(WriteRecord, "Annotate", None, SetupPhases)
+
+    Progress = {"Start": time.perf_counter(), "Rows": 0, "Done": 0,
+                "Total": len(ProcessID)}
+
+    #One participant at a time
+    if Jobs == 1 and Pipeline == 0:
+
+        #Function defined below
+        Messages = (AnnotateTry(i, *Args, ProfileFile = j)
+                    for i, j in zip(ProcessID, ProfileFiles))
+
+    #One participant at a time, reading and writing on background threads
+    #Function defined below.
+    elif Jobs == 1:
+
+        Messages = AnnotatePipeline(ProcessID, Pipeline, *Args)
+
+    #Participants distributed across a pool of processes
+    #The arguments that are the same for every participant, including the
+    #annotation table, are passed once to each process (by function
+    #SetupWorker) rather than once per participant. Results are returned in
+    #the order of ParticipantID regardless of the order in which they finish,
+    #so progress is reported in the same order as when Jobs is 1.
+    else:
+
+        Pool = ProcessPoolExecutor(max_workers = Jobs,
+                                   initializer = SetupWorker,
+                                   initargs = Args)
+
+        #Functions defined below
+        Messages = Pool.map(AnnotateWorker, ProcessID, ProfileFiles,
+                            chunksize = 1)
+
+    #Participants for whom an error occurred
+    ErrorID = []
+
+    for i in ParticipantID:
+
         #Progress notification
-        print("..." + str(i))           
-  
-        try:  
-            
-            #Annotate and write output (annotated) iMotions data file for 
-            #ith participant.
-            AnnotateInsert(i, InputDataFolder, Annotations, HeadingList,  
-                     HeadingListAnnt, OutputDataFolder)
-                        
-        except:
-            
-            #Display message
-            message = \
-                ''.join(["Unknown error while processing ID ", str(i), \
-                         ".", " Skipping to next file."])    
-                
+        print("..." + str(i))
+
+        if i in UpToDate:
+
+            print("...Output file for ID " + str(i) + " is up to date." + \
+                  " Skipping to next file.")
+
+            continue
+
+        message, Phases = next(Messages)
+
+        #Function defined in Instrumentation.py
+        if WriteRecord != None:
+
+            LogParticipant(WriteRecord, "Annotate", i, Phases, Progress)
+
+        #Display message if the participant was skipped
+        if message != None:
+
             print(message)
-            
-            #Continue to data set of next participant
-            continue   
+
+            if message.startswith("Error"):
+
+                ErrorID.append(str(i))
+
+        #Record the participant in the manifest, or remove it if the
+        #participant was skipped, so that it is processed again next time
+        #Functions defined below.
+        if message == None:
+
+            Manifest[str(i)] = \
+                RecordOutput(Entries[str(i)], OutputDataFolder)
+
+        else:
+
+            Manifest.pop(str(i), None)
+
+        WriteManifest(Manifest, ManifestFile)
+
+    if Jobs != 1:
+
+        Pool.shutdown()
+
+    ##### Combine event index files #####
+
+    #Combine the event index files of the participants into one file
+    if EventIndex == "study":
+
+        #Function defined below
+        CombineEventIndex(ParticipantID, OutputDataFolder, ErrorID)
+
+    if len(ErrorID) != 0:
+
+        print("\nErrors occurred while processing IDs " + \
+              ", ".join(ErrorID) + ". These IDs were skipped.")
       
     ##### Completion message #####
 
     print("\nAnnotation operations completed." + \
           "\nFiles written to " + OutputDataFolder + ".\n")  
-         
- 
\ No newline at end of file
+
+
+##########################################################
+##### Define functions to keep a manifest of outputs #####
+##########################################################
+
+#File name of the manifest, which is written to OutputDataFolder
+ManifestName = "Manifest.json"
+
+def ReadManifest(ManifestFile):
+
+    #Return the manifest written by a previous run as a dict with one entry
+    #per participant ID, or an empty dict if there is none (or it cannot be
+    #read).
+
+    if not exists(ManifestFile):
+
+        return {}
+
+    try:
+
+        with open(ManifestFile, "r") as File:
+
+            return json.load(File)["Participants"]
+
+    except (ValueError, KeyError, TypeError):
+
+        return {}
+
+
+def WriteManifest(Manifest, ManifestFile):
+
+    #Write the manifest. It is first written to a temporary file, which then
+    #replaces the manifest, so that an interrupted run does not leave a
+    #partly written manifest.
+
+    with open(ManifestFile + ".tmp", "w") as File:
+
+        json.dump({"Version": 1, "Participants": Manifest}, File, indent = 1)
+
+    replace(ManifestFile + ".tmp", ManifestFile)
+
+
+def ManifestEntry(i, InputDataFolder, Annotations, Settings):
+
+    #Return the current state of the inputs of participant i: the size and
+    #modification time of the iMotions data file, the start times of the
+    #participant in the Excel annotations file, and the settings. Return None
+    #if the iMotions data file does not exist.
+
+    path = ''.join([InputDataFolder, "/", str(i), ".txt"])
+
+    if not exists(path):
+
+        return None
+
+    Stat = stat(path)
+
+    #Start times of the participant (see function InsertEvents)
+    #NaN is recorded as None.
+    Times = Annotations["StartTimes"][Annotations["Rows"][i]]
+
+    return {"InputFile":  path,
+            "InputSize":  Stat.st_size,
+            "InputMTime": Stat.st_mtime_ns,
+            "StartTimes": [None if np.isnan(t) else float(t) for t in Times],
+            "Settings":   Settings}
+
+
+def OutputFile(Entry, OutputDataFolder):
+
+    #Return the name of the file written for a participant
+
+    ID = Path(Entry["InputFile"]).stem
+
+    if Entry["Settings"]["EventIndex"] != None:
+
+        return OutputDataFolder + "/" + ID + EventIndexExtension
+
+    return OutputDataFolder + "/" + \
+           DataFileName(ID, Entry["Settings"]["OutputFormat"],
+                        Entry["Settings"]["Compression"])
+
+
+def Checksum(path):
+
+    #Return the SHA-256 checksum of a file, read 1 MB at a time. Only used
+    #for manifests written before the size and modification time of the
+    #files written were recorded (see function IsUpToDate).
+
+    Hash = hashlib.sha256()
+
+    with open(path, "rb") as File:
+
+        for Block in iter(lambda: File.read(1 << 20), b""):
+
+            Hash.update(Block)
+
+    return Hash.hexdigest()
+
+
+def RecordOutput(Entry, OutputDataFolder):
+
+    #Return the manifest entry of a participant after its file was written,
+    #i.e., the state of its inputs plus the size and modification time of the
+    #file written. The file is not read again.
+
+    Stat = stat(OutputFile(Entry, OutputDataFolder))
+
+    Record = dict(Entry)
+
+    Record["OutputSize"]  = Stat.st_size
+    Record["OutputMTime"] = Stat.st_mtime_ns
+
+    return Record
+
+
+def IsUpToDate(Entry, Record, OutputDataFolder):
+
+    #Return whether the file of a participant written by a previous run
+    #(manifest entry Record) is up to date with the current state of its
+    #inputs (Entry) and has not been changed since it was written. Whether
+    #the file has been changed is determined from its size and modification
+    #time, so that the file does not need to be read. Only entries of older
+    #manifests, which recorded a checksum instead, are checked by reading
+    #the file.
+
+    if Entry == None or Record == None:
+
+        return False
+
+    for Key in Entry:
+
+        if Record.get(Key) != Entry[Key]:
+
+            return False
+
+    path = OutputFile(Entry, OutputDataFolder)
+
+    if not exists(path):
+
+        return False
+
+    Stat = stat(path)
+
+    if "OutputSize" in Record:
+
+        return Stat.st_size     == Record["OutputSize"] and \
+               Stat.st_mtime_ns == Record.get("OutputMTime")
+
+    #Function defined above
+    return "OutputChecksum" in Record and \
+           Checksum(path) == Record["OutputChecksum"]
+
+
+#################################################################
+##### Define function to import and modify Excel timestamps #####
+#################################################################
+
+def SetupAnnotations(ExcelFile, CacheFolder = None, NEvents = 11):
+
+    #If CacheFolder is specified, the compiled annotations are written to a
+    #cache file in this folder and, as long as the Excel annotations file is
+    #not changed, read from the cache rather than from the Excel annotations
+    #file.
+
+    ##### Use cached annotations if up to date #####
+
+    #Function defined below
+    Key = AnnotationsKey(ExcelFile, NEvents)
+
+    if CacheFolder != None:
+
+        CacheFile = CacheFolder + "/" + AnnotationsCacheName
+
+        #Function defined below
+        Out = ReadAnnotationsCache(CacheFile, Key)
+
+        if Out != None:
+
+            return Out
+
+    #Import Excel file with the timestamps that correspond to the start  
+    #times of events.
+    #E.g., for participant 4001, the first task begins at 10:41 AM and the 
+    #second task begins at 10:49 AM.
+    #The workbook is read in read-only (streaming) mode. Only the column
+    #headers are read at first; of the remaining rows, only the columns to be
+    #used are kept (see below).
+    Workbook = openpyxl.load_workbook(ExcelFile, read_only = True,
+                                      data_only = True)
+
+    Sheet = Workbook.worksheets[AnnotationsSheet]
+
+    #Function defined below
+    Columns = ReadSheetHeaders(Sheet)
+     
+    ##### Select columns to use for annotations ######
+
+    #Start at either column "Webcam Start.1" or "Webcam Start" 
+    #Note: there may be two columns with the heading "Webcam Start". If two,   
+    #the second will be automatically relabelled "Webcam Start.1" when  
+    #imported. If there are two, use the second column ("Webcam Start.1"). 
+    FirstColumnLabel = "Webcam Start.1"
+    
+    if not any(Columns == "Webcam Start.1"):
+        
+        FirstColumnLabel = "Webcam Start"
+       
+    #Determine the index of the starting column
+    Idx = Columns.get_loc(FirstColumnLabel)
+    
+    #Vector of columns labels to be used
+    #These columns correspond to the events (11 by default), each of which
+    #represents an annotation. Start at "Webcam Start.1" (or "Webcam Start"). 
+    HeadingList = Columns[range(Idx, Idx + NEvents)]
+
+    #Read the rows of the columns to be used
+    #Function defined below.
+    Annotations = \
+        ReadSheetColumns(Sheet, Columns, ["Participant #"] + list(HeadingList))
+
+    Workbook.close()
+          
+    ##### Modify elements in HH:MM:SS format to millisecond format #####
+    
+    #Modify the format of elements in the columns to be used from HH:MM:SS 
+    #format to millisecond format. This will match the format of the iMotions 
+    #data sets, allowing annotations to be added to the iMotions data sets 
+    #later. 
+    #Note: each element represents the start time of the event by participant. 
+    
+    #All cells of the columns to be used, one row per row of the Excel file
+    Cells = Annotations.loc[:, HeadingList].to_numpy(dtype = object)
+
+    #Cells with a HH:MM:SS element
+    #Determined by checking whether a datetime.time type is present. Other
+    #cells may be blank or have another non-time entry; these are NaN.
+    IsTime = \
+        np.frompyfunc(lambda x: type(x) == datetime.time, 1, 1)(Cells) \
+            .astype(bool)
+
+    #Convert HH:MM:SS to milliseconds
+    #Fractions of a second are dropped.
+    Times = np.full(Cells.shape, np.nan)
+
+    if IsTime.any():
+
+        Times[IsTime] = \
+            np.floor(pd.to_timedelta(Cells[IsTime].astype(str))
+                       .total_seconds().to_numpy()) * \
+            1000
+               
+    ##### Adjust milliseconds to start at webcam start #####    
+    
+    #In other words, milliseconds will equal time elapsed since webcam start 
+    #rather than equal clock time. Doing so will make the format of the start 
+    #times correspond to the format of iMotions data. 
+    #The webcam start time is the first column to be used ("Webcam Start.1"
+    #or "Webcam Start").
+    Times = Times - Times[:, [0]]
+    
+    ##### Determine participants to loop through #####       
+        
+    #This is determined based upon the entries in the Excel annotations 
+    #file in column 'Participant #'. Later, the folder specified by 
+    #InputDataFolder will be inspected for iMotions data files that match the 
+    #ID found in this column. For each matching file found, an output file will 
+    #be written. 
+
+    IDs = Annotations.loc[:, "Participant #"].to_numpy(dtype = object)
+    
+    #Only retain participant IDs that are integers other than 0
+    #This is intended to exclude blank rows, strings, or other non-ID entries. 
+    IsID = \
+        np.frompyfunc(lambda x: isinstance(x, (int, np.integer)) and \
+                                not isinstance(x, bool), 1, 1)(IDs) \
+            .astype(bool)
+
+    IsID[IsID] = IDs[IsID] != 0
+
+    #Remove non-unique IDs
+    #The first row of an ID that appears in more than one row is used.
+    ParticipantID, First = \
+        np.unique(IDs[IsID].astype(np.int64), return_index = True)
+
+    ##### Compile annotations #####
+
+    #The start times of all participants are kept in one array with one row
+    #per participant (in the order of ParticipantID) and one column per event
+    #(in the order of HeadingList), together with the row of each participant
+    #ID. The start times of a participant are then looked up directly rather
+    #than searched for in the Excel annotations file.
+    Annotations = \
+        {"StartTimes": Times[np.flatnonzero(IsID)[First]],
+         "Rows":       dict(zip(ParticipantID.tolist(),
+                                range(ParticipantID.size)))}
+    
+    ##### Specify annotation text #####
+    
+    #As mentioned previously, the annotation text is the same as the column
+    #headers. However, if "Webcam Start.1" is present rather than 
+    #"Webcam Start", use "Webcam Start" instead as this is the text used in the 
+    #Excel annotations file.
+    
+    HeadingListAnnt = list(HeadingList)
+    HeadingListAnnt[0] = "Webcam Start"      
+
+    ##### Cache compiled annotations #####
+
+    #Function defined below
+    if CacheFolder != None:
+
+        WriteAnnotationsCache(CacheFile, Key, Annotations, HeadingList,
+                              HeadingListAnnt, ParticipantID)
+
+
+    return [Annotations, HeadingList, HeadingListAnnt, ParticipantID]
+
+
+def ReadSheetHeaders(Sheet):
+
+    #Return the column headers (first row) of a worksheet opened in read-only
+    #mode. As with function read_excel of Pandas, a repeated header is
+    #relabelled by appending ".1", ".2", etc. (e.g., the second
+    #"Webcam Start" becomes "Webcam Start.1") and a blank header is labelled
+    #"Unnamed: " followed by its column index.
+
+    Headers = next(Sheet.iter_rows(max_row = 1, values_only = True), ())
+
+    Columns = []
+
+    for j, Header in enumerate(Headers):
+
+        Header = "Unnamed: " + str(j) if Header == None else str(Header)
+
+        Count = 0
+        Label = Header
+
+        while Label in Columns:
+
+            Count = Count + 1
+            Label = Header + "." + str(Count)
+
+        Columns.append(Label)
+
+
+    return pd.Index(Columns)
+
+
+def ReadSheetColumns(Sheet, Columns, UseColumns):
+
+    #Return a dataframe with the columns UseColumns (of column headers
+    #Columns) of the rows below the column headers of a worksheet opened in
+    #read-only mode. Only the range of columns that spans UseColumns is read.
+    #As with function read_excel of Pandas, whole numbers stored as decimals
+    #(e.g., 4001.0) are converted to int.
+
+    Positions = Columns.get_indexer(UseColumns)
+
+    #Verify columns present
+    #Index -1 marks a column that is not among the column headers.
+    Missing = [UseColumns[j] for j in np.flatnonzero(Positions == -1)]
+
+    assert( len(Missing) == 0 ), \
+    "Error in Annotate: The Excel annotations file does not appear to have" \
+    " column(s) " + ", ".join(Missing) + "."
+
+    MinCol = Positions.min()
+
+    Rows = Sheet.iter_rows(min_row = 2,
+                           min_col = MinCol + 1,
+                           max_col = Positions.max() + 1,
+                           values_only = True)
+
+    Cells = [[Row[j - MinCol] for j in Positions] for Row in Rows]
+
+    Cells = np.array(Cells, dtype = object).reshape(-1, len(UseColumns))
+
+    IsWhole = \
+        np.frompyfunc(lambda x: type(x) == float and x.is_integer(), 1, 1) \
+                     (Cells).astype(bool)
+
+    Cells[IsWhole] = [int(x) for x in Cells[IsWhole]]
+
+
+    return pd.DataFrame(Cells, columns = UseColumns)
+
+
+##############################################################
+##### Define functions to cache the compiled annotations #####
+##############################################################
+
+#File name of the cache of compiled annotations
+AnnotationsCacheName = "Annotations.npz"
+
+#Worksheet of the Excel annotations file that is read (the first)
+AnnotationsSheet = 0
+
+#Version of the compiled annotations; a cache of another version is not used
+AnnotationsVersion = 1
+
+def AnnotationsKey(ExcelFile, NEvents):
+
+    #Return the key that identifies the Excel annotations file of a cache:
+    #its full path, size, modification time, the worksheet read, and the
+    #number of events
+
+    Stat = stat(ExcelFile)
+
+    return json.dumps({"ExcelFile": str(Path(ExcelFile).resolve()),
+                       "Size":      Stat.st_size,
+                       "MTime":     Stat.st_mtime_ns,
+                       "Sheet":     AnnotationsSheet,
+                       "NEvents":   NEvents,
+                       "Version":   AnnotationsVersion})
+
+
+def ReadAnnotationsCache(CacheFile, Key):
+
+    #Return the output of function SetupAnnotations from a cache file, or
+    #None if there is no cache file or it was written for another Excel
+    #annotations file (or another version of it).
+
+    if not exists(CacheFile):
+
+        return None
+
+    try:
+
+        with np.load(CacheFile, allow_pickle = False) as Cache:
+
+            if str(Cache["Key"]) != Key:
+
+                return None
+
+            ParticipantID = Cache["ParticipantID"]
+
+            Annotations = \
+                {"StartTimes": Cache["StartTimes"],
+                 "Rows":       dict(zip(ParticipantID.tolist(),
+                                        range(ParticipantID.size)))}
+
+            return [Annotations,
+                    pd.Index(Cache["HeadingList"].tolist()),
+                    Cache["HeadingListAnnt"].tolist(),
+                    ParticipantID]
+
+    except (ValueError, KeyError, OSError):
+
+        return None
+
+
+def WriteAnnotationsCache(CacheFile, Key, Annotations, HeadingList,
+                          HeadingListAnnt, ParticipantID):
+
+    #Write the compiled annotations to a cache file. It is first written to a
+    #temporary file, which then replaces the cache file.
+
+    with open(CacheFile + ".tmp", "wb") as File:
+
+        np.savez(File,
+                 Key             = np.array(Key),
+                 StartTimes      = Annotations["StartTimes"],
+                 ParticipantID   = ParticipantID,
+                 HeadingList     = np.array(list(HeadingList), dtype = str),
+                 HeadingListAnnt = np.array(HeadingListAnnt, dtype = str))
+
+    replace(CacheFile + ".tmp", CacheFile)
+
+
+###################################################
+##### Define function to import iMotions data #####
+###################################################
+
+def ReadiMotions(path, usecols = None, ChunkSize = None, dtype = None,
+                 InputCache = None):
+
+    #Note: usecols optionally restricts the columns that are read (e.g., to
+    #"MediaTime" and the expressions to be aggregated). If None, all columns
+    #are read.
+
+    #Note: if ChunkSize is specified, an iterator is returned that reads the
+    #data ChunkSize rows at a time (a pandas TextFileReader, which should be
+    #closed after use, e.g., with a "with" statement). The chunks keep the row
+    #index of the whole file. If None, the data are returned as a single
+    #dataframe.
+
+    #Note: dtype optionally specifies the types of columns (see function
+    #ColumnTypes in "DataFiles.py"), which are then not inferred. Columns
+    #that are not present in the file are ignored.
+
+    #Note: if InputCache (a folder) is specified, the whole file is read from
+    #its binary cache in this folder, which is written the first time the
+    #file is read (see function ReadTableCached in "DataFiles.py"). The cache
+    #is not used if reading in chunks.
+
+    #Read data
+    #The whole file is read by function ReadTable, which uses the csv reader
+    #of PyArrow, if installed, to parse the file with several threads (see
+    #"DataFiles.py"). If reading in chunks, only the header is read here.
+    #Functions defined in DataFiles.py.
+    if ChunkSize == None and InputCache != None:
+
+        Data = ReadTableCached(path,
+                               InputCache,
+                               sep = '\t',
+                               skiprows = 5, #to read the data correctly
+                               usecols = usecols,
+                               dtype = dtype)
+
+    elif ChunkSize == None:
+
+        Data = ReadTable(path,
+                         sep = '\t',
+                         skiprows = 5, #to read the data correctly
+                         usecols = usecols,
+                         dtype = dtype)
+
+    else:
+
+        Data = \
+            pd.read_table(path,
+                          sep = '\t', 
+                          skiprows = 5, #to read the data correctly 
+                          usecols = usecols, 
+                          dtype = dtype,
+                          nrows = 0)
+     
+    #Confirm that column "MediaTime" is present in file
+    #If reading in chunks, only the header has been read at this point.
+    assert( any(Data.columns == "MediaTime") ), \
+    "Error in Annotate: Column 'MediaTime', which is required, not" \
+    " present in iMotions input file " + str(path)                                                  
+
+    #Numbers are parsed as when the whole file is read
+    #Function defined in DataFiles.py.
+    if ChunkSize != None:
+
+        Data = \
+            pd.read_table(path,
+                          sep = '\t',
+                          skiprows = 5,
+                          usecols = usecols,
+                          dtype = dtype,
+                          float_precision = FloatPrecision(),
+                          chunksize = ChunkSize)
+
+
+    return Data
+
+
+##################################################
+##### Define function to insert event labels #####
+##################################################
+
+def InsertEvents(Data, i, Annotations, HeadingList):
+
+    ##### Start times of events for the ith participant #####
+
+    #Start times from the annotation Excel file, in milliseconds since webcam
+    #start (see function SetupAnnotations). The first event ("Webcam Start")
+    #is not included as it starts at 0 by definition.
+    Times_IDith = Annotations["StartTimes"][Annotations["Rows"][i], 1:]
+
+    ##### Insert column of event labels #####
+
+    #Integer code of event for each row of the iMotions data set
+    #Function defined below.
+    Codes = \
+        EventCodes(Data.loc[:, 'MediaTime'].to_numpy(dtype = float),
+                   Times_IDith)
+
+    #The labels are stored as a categorical column (integer codes plus one
+    #copy of each label) rather than as one string per row. They are only
+    #converted to text when the data set is written. Rows that do not belong
+    #to any event (code -1) are blank.
+    Data.insert(
+        loc = 1, #column index
+        column = 'Event', #column label
+        value = pd.Categorical.from_codes(Codes,
+                                          categories = list(HeadingList)))
+
+
+    return Data
+
+
+##############################################################
+##### Define function to determine event codes from time #####
+##############################################################
+
+def EventCodes(MediaTime, StartTimes):
+
+    #Determine the event of each row of an iMotions data set.
+
+    #MediaTime holds the timestamps of the data set and StartTimes the start
+    #times of the events that follow "Webcam Start" (both in milliseconds
+    #since webcam start; NumPy arrays of floats). An integer code is returned
+    #for each row, where code j indicates the jth event ("Webcam Start" is 0)
+    #and code -1 indicates that the row does not belong to any event (e.g., it
+    #precedes webcam start). A row belongs to the latest event that started
+    #at or before its timestamp. Any number of events can be used.
+
+    #Start time of every event, including "Webcam Start" (0 ms)
+    Starts = np.concatenate(([0.0], StartTimes))
+
+    NEvents = Starts.size
+
+    #Use the smallest integer type that holds all codes
+    CodeType = np.min_scalar_type(-NEvents)
+
+    ##### Start times are present and in chronological order #####
+
+    if not np.isnan(Starts).any() and (np.diff(Starts) >= 0).all():
+
+        #If MediaTime is sorted (as is usual for iMotions data)
+        if not np.isnan(MediaTime).any() and \
+           (np.diff(MediaTime) >= 0).all():
+
+            #Row at which each event starts
+            #A single binary search per event rather than a comparison with
+            #every row per event.
+            RowStarts = np.searchsorted(MediaTime, Starts, side = 'left')
+
+            #Number of rows of each event, including the rows that precede
+            #"Webcam Start" (code -1)
+            RowCounts = \
+                np.diff(np.concatenate(([0], RowStarts, [MediaTime.size])))
+
+            #Fill each event's block of rows with its code
+            Codes = \
+                np.repeat(np.arange(-1, NEvents, dtype = CodeType),
+                          RowCounts)
+
+        #If MediaTime is not sorted, search the start times for each row
+        #instead
+        else:
+
+            Codes = \
+                np.searchsorted(Starts, MediaTime, side = 'right') \
+                  .astype(CodeType) - 1
+
+            #Missing timestamps do not belong to any event
+            Codes[np.isnan(MediaTime)] = -1
+
+    ##### Start times are missing or not in chronological order #####
+
+    #Fall back on labelling event by event, where each event is labelled from
+    #the start time of the event to the start time of the next event and
+    #later events overwrite earlier ones. Comparisons with a missing start
+    #time are false, so an event with a missing start time, and the event
+    #before it, are not labelled.
+    else:
+
+        Codes = np.full(MediaTime.size, -1, dtype = CodeType)
+
+        for j in range(1, NEvents):
+
+            LogIdx = (MediaTime >= Starts[j - 1]) & (MediaTime <= Starts[j])
+
+            Codes[LogIdx] = j - 1
+
+        Codes[MediaTime >= Starts[-1]] = NEvents - 1
+
+
+    return Codes
+
+
+###########################################################
+##### Define function to annotate iMotions data files #####
+###########################################################
+
+def AnnotateInsert(i, InputDataFolder, Annotations, HeadingList,  
+                   HeadingListAnnt, OutputDataFolder, ChunkSize = None,
+                   OutputFormat = "csv", EventIndex = None,
+                   KeepColumns = None, TrimRows = False, Types = None,
+                   Compression = None, InputCache = None, Phases = None):
+
+    #The elapsed time, rows, and bytes of phases "Read", "Label", and "Write"
+    #(or "Index", if EventIndex is specified) are added to dict Phases, if
+    #specified (see file "Instrumentation.py").
+        
+    #Import txt file with iMotions data: 
+   
+    #File name of an iMotions data set
+    path = ''.join([InputDataFolder, "/", str(i), ".txt"])
+
+    #File name for annotated data set
+    #Function defined in DataFiles.py.
+    OutputDataFile = \
+        OutputDataFolder + "/" + DataFileName(i, OutputFormat, Compression)
+
+    #Columns to read
+    #Function defined below.
+    UseColumns = InputColumns(EventIndex, KeepColumns)
+
+    #If the specified data file does not exist
+    #Requires function "exists".
+    if not exists(path):
+        
+        #Message to display
+        #Function defined below.
+        return MissingMessage(i)
+
+    #Remove the data file of the participant written by an earlier run in
+    #another format or with another compression, if any, so that the
+    #participant is not aggregated twice
+    #Function defined in DataFiles.py.
+    if EventIndex == None:
+
+        RemoveDataFiles(OutputDataFolder, i,
+                        DataFileName(i, OutputFormat, Compression))
+
+    #If the specified data file is to be read all at once
+    #Read data, insert annotations in column "Event", and write data file
+    #with annotations (or event index)
+    #Functions defined below.
+    if ChunkSize == None:
+
+        Data = ReadParticipant(path, UseColumns, Types, Phases, InputCache)
+
+        Data = LabelParticipant(Data, i, Annotations, HeadingList, TrimRows,
+                                Phases)
+
+        WriteParticipant(Data, i, path, OutputDataFolder, OutputFormat,
+                         EventIndex, Compression, Phases)
+
+        return None
+
+    #If the specified data file is to be read in chunks
+    #Each chunk is read, annotated, and appended to the output file before
+    #the next chunk is read, so only one chunk is held in memory. Because the
+    #event of a row depends only on its timestamp, chunks are annotated
+    #independently of one another; an event that spans chunk edges is
+    #labelled the same as when the whole file is read at once.
+    else:
+
+        Writer = None
+
+        Runs = []
+
+        #Function defined above
+        with ReadiMotions(path, usecols = UseColumns, ChunkSize = ChunkSize,
+                          dtype = Types) as Reader:
+
+            #The phases of each chunk are summed
+            #Function AddPhase defined in Instrumentation.py.
+            Start = time.perf_counter()
+
+            for k, Data in enumerate(Reader):
+
+                AddPhase(Phases, "Read", Start, len(Data))
+
+                #Insert annotations in column "Event"
+                #Function defined above.
+                Start = time.perf_counter()
+
+                Data = InsertEvents(Data, i, Annotations, HeadingList)
+
+                #Remove rows without an event
+                if TrimRows:
+
+                    Data = Data[Data.Event.cat.codes.to_numpy() != -1]
+
+                AddPhase(Phases, "Label", Start, len(Data))
+
+                Start = time.perf_counter()
+
+                #Write (first chunk) or append (remaining chunks) data with
+                #annotations
+                #Function defined in DataFiles.py.
+                if EventIndex == None:
+
+                    Writer = \
+                        WriteData(Data, OutputDataFile, OutputFormat, k, 
+                                  Writer, Compression)
+
+                #Find the rows of each event within the chunk
+                #Function defined below.
+                else:
+
+                    Runs.append(EventRuns(Data))
+
+                AddPhase(Phases, "Write" if EventIndex == None else "Index",
+                         Start, len(Data))
+
+                Start = time.perf_counter()
+
+        Start = time.perf_counter()
+
+        CloseWriter(Writer)
+
+        AddPhase(Phases, "Write" if EventIndex == None else "Index", Start)
+
+        AddPhase(Phases, "Read", time.perf_counter(), Bytes = getsize(path))
+
+        #Join events that span chunk edges and write event index to file
+        #Functions defined below.
+        if EventIndex != None:
+
+            Runs = JoinRuns(pd.concat(Runs, ignore_index = True))
+
+            WriteEventIndex(Runs, i, path, OutputDataFolder, Phases)
+
+        #Bytes written
+        else:
+
+            AddPhase(Phases, "Write", time.perf_counter(),
+                     Bytes = getsize(OutputDataFile))
+
+
+def InputColumns(EventIndex = None, KeepColumns = None):
+
+    #Columns of an iMotions data file to read (see function AnnotateInsert),
+    #or None to read all columns. Only "MediaTime" is needed to write an
+    #event index.
+
+    if EventIndex != None:
+
+        return ["MediaTime"]
+
+    if KeepColumns != None:
+
+        return ["MediaTime"] + [j for j in KeepColumns if j != "MediaTime"]
+
+    return None
+
+
+def MissingMessage(i):
+
+    #Message to display if the iMotions data file of the ith participant
+    #does not exist
+
+    return ''.join(["...iMotions data file not present for ID ", \
+                    str(i), ".", \
+                    " Skipping to next file."])
+
+
+def ReadParticipant(path, UseColumns = None, Types = None, Phases = None,
+                    InputCache = None):
+
+    #Read a whole iMotions data file (see function AnnotateInsert)
+
+    Start = time.perf_counter()
+
+    #Function defined above
+    Data = ReadiMotions(path, usecols = UseColumns, dtype = Types,
+                        InputCache = InputCache)
+
+    #Function defined in Instrumentation.py
+    AddPhase(Phases, "Read", Start, len(Data), getsize(path))
+
+
+    return Data
+
+
+def LabelParticipant(Data, i, Annotations, HeadingList, TrimRows = False,
+                     Phases = None):
+
+    #Insert the annotations of the ith participant in column "Event" (see
+    #function AnnotateInsert)
+
+    Start = time.perf_counter()
+
+    #Function defined above
+    Data = InsertEvents(Data, i, Annotations, HeadingList)
+
+    #Remove rows without an event
+    if TrimRows:
+
+        Data = Data[Data.Event.cat.codes.to_numpy() != -1]
+
+    #Function defined in Instrumentation.py
+    AddPhase(Phases, "Label", Start, len(Data))
+
+
+    return Data
+
+
+def WriteParticipant(Data, i, path, OutputDataFolder, OutputFormat = "csv",
+                     EventIndex = None, Compression = None, Phases = None):
+
+    #Write the annotated iMotions data of the ith participant, read from
+    #file path, to a data file or, if EventIndex is specified, an event index
+    #file (see function AnnotateInsert)
+
+    Start = time.perf_counter()
+
+    #Write data file with annotations
+    #Functions defined in DataFiles.py and Instrumentation.py.
+    if EventIndex == None:
+
+        OutputDataFile = \
+            OutputDataFolder + "/" + \
+            DataFileName(i, OutputFormat, Compression)
+
+        WriteData(Data, OutputDataFile, OutputFormat,
+                  Compression = Compression)
+
+        AddPhase(Phases, "Write", Start, len(Data), getsize(OutputDataFile))
+
+    #Find the rows of each event and write event index to file
+    #Functions defined below.
+    else:
+
+        Runs = EventRuns(Data)
+
+        AddPhase(Phases, "Index", Start, len(Data))
+
+        WriteEventIndex(Runs, i, path, OutputDataFolder, Phases)
+
+
+####################################################
+##### Define functions to write an event index #####
+####################################################
+
+def WriteEventIndex(Runs, i, path, OutputDataFolder, Phases = None):
+
+    #Write the event index of the ith participant (from function EventRuns),
+    #whose iMotions data file is path, to file, e.g., "4001.events.csv"
+
+    Runs.insert(0, "ID", i)
+    Runs["SourceFile"] = path
+
+    IndexFile = ''.join([OutputDataFolder, "/", str(i), EventIndexExtension])
+
+    Start = time.perf_counter()
+
+    Runs.to_csv(IndexFile,
+                index = False) #No row index (default is True)
+
+    #Function defined in Instrumentation.py
+    AddPhase(Phases, "Index", Start, Bytes = getsize(IndexFile))
+
+
+def EventRuns(Data):
+
+    #Return a dataframe with one row per run of consecutive rows of Data with
+    #the same event: the event, the MediaTime of the first and last row, and
+    #the row offset of the first row and of the row after the last row. Row
+    #offsets are taken from the row index of Data, which for chunks continues
+    #from the previous chunk. Rows without an event are not included.
+
+    Codes = Data.Event.cat.codes.to_numpy()
+
+    if Codes.size == 0:
+
+        return pd.DataFrame({"Event":     pd.Series([], dtype = object),
+                             "StartTime": pd.Series([], dtype = float),
+                             "EndTime":   pd.Series([], dtype = float),
+                             "StartRow":  pd.Series([], dtype = np.int64),
+                             "EndRow":    pd.Series([], dtype = np.int64)})
+
+    #Rows at which the event changes
+    Changes = np.flatnonzero(Codes[1:] != Codes[:-1]) + 1
+
+    Starts = np.concatenate(([0], Changes))
+    Ends   = np.concatenate((Changes, [Codes.size]))
+
+    #Drop runs without an event
+    Keep   = Codes[Starts] != -1
+    Starts = Starts[Keep]
+    Ends   = Ends[Keep]
+
+    MediaTime = Data.MediaTime.to_numpy()
+    Rows      = Data.index.to_numpy()
+
+    return pd.DataFrame(
+        {"Event":     np.asarray(Data.Event.cat.categories, 
+                                 dtype = object)[Codes[Starts]],
+         "StartTime": MediaTime[Starts],
+         "EndTime":   MediaTime[Ends - 1],
+         "StartRow":  Rows[Starts].astype(np.int64),
+         "EndRow":    Rows[Ends - 1].astype(np.int64) + 1})
+
+
+def JoinRuns(Runs):
+
+    #Join runs that continue one another, i.e., that have the same event and
+    #where one starts at the row at which the previous one ends (e.g., a run
+    #split across two chunks).
+
+    New = (Runs.Event != Runs.Event.shift()) | \
+          (Runs.StartRow != Runs.EndRow.shift())
+
+    return Runs.groupby(New.cumsum().to_numpy(), sort = False) \
+               .agg({"Event":     "first",
+                     "StartTime": "first",
+                     "EndTime":   "last",
+                     "StartRow":  "first",
+                     "EndRow":    "last"}) \
+               .reset_index(drop = True)
+
+
+def CombineEventIndex(ParticipantID, OutputDataFolder, ErrorID):
+
+    #Combine the event index files of the participants (e.g.,
+    #"4001.events.csv") into one file ("EventIndex.csv") and remove the
+    #event index files of the participants. Participants for whom an error
+    #occurred (ErrorID) are not included.
+
+    Files = [''.join([OutputDataFolder, "/", str(i), EventIndexExtension])
+             for i in ParticipantID if str(i) not in ErrorID]
+
+    Files = [File for File in Files if exists(File)]
+
+    if len(Files) == 0:
+
+        return
+
+    pd.concat([pd.read_csv(File) for File in Files], ignore_index = True) \
+      .to_csv(OutputDataFolder + "/" + EventIndexFile,
+              index = False) #No row index (default is True)
+
+    for File in Files:
+
+        remove(File)
+
+
+############################################################
+##### Define functions to annotate in worker processes #####
+############################################################
+
+def AnnotateTry(i, *Args, ProfileFile = None):
+
+    #Annotate the ith participant (function AnnotateInsert) and return a
+    #message if the participant was skipped, otherwise None, together with
+    #the phases of the participant (see file "Instrumentation.py"). Errors
+    #are returned as a message, which includes the type and description of
+    #the error, so that one participant does not stop the remaining ones. If
+    #ProfileFile is specified, the participant is annotated under the Python
+    #profiler and the statistics are written to ProfileFile.
+
+    Phases = {}
+
+    Start = time.perf_counter()
+
+    #Functions defined in Instrumentation.py
+    try:
+
+        message = RunProfiled(ProfileFile, AnnotateInsert, i, *Args, Phases)
+
+    #Function defined below
+    except Exception as e:
+
+        message = ErrorMessage(i, e)
+
+    AddParticipant(Phases, Start)
+
+    return [message, Phases]
+
+
+def ErrorMessage(i, e):
+
+    #Message to display if error e occurred while processing the ith
+    #participant, which includes the type and description of the error
+
+    return ''.join(["Error while processing ID ", str(i), ": ",
+                    type(e).__name__, ": ", str(e), ".", \
+                    " Skipping to next file."])
+
+
+#Arguments that are the same for every participant, set once in each worker
+#process of a process pool by function SetupWorker
+WorkerArgs = None
+
+def SetupWorker(*Args):
+
+    global WorkerArgs
+
+    WorkerArgs = Args
+
+
+def AnnotateWorker(i, ProfileFile = None):
+
+    #Annotate the ith participant in a worker process
+    return AnnotateTry(i, *WorkerArgs, ProfileFile = ProfileFile)
+
+
+##########################################################################
+##### Define functions to annotate in a read/annotate/write pipeline #####
+##########################################################################
+
+def AnnotatePipeline(ProcessID, Depth, InputDataFolder, Annotations,
+                     HeadingList, HeadingListAnnt, OutputDataFolder,
+                     ChunkSize = None, OutputFormat = "csv", EventIndex = None,
+                     KeepColumns = None, TrimRows = False, Types = None,
+                     Compression = None, InputCache = None):
+
+    #Annotate the participants of ProcessID (see argument Pipeline of
+    #function Annotate). The iMotions data files are read on one background
+    #thread, up to Depth participants ahead of the participant being
+    #annotated, and the annotated files are written on another background
+    #thread, up to Depth participants behind. The annotations are inserted
+    #in the current thread. For each participant, in the order of ProcessID,
+    #the same is returned as by function AnnotateTry, once the file of the
+    #participant has been written.
+
+    Reader = ThreadPoolExecutor(max_workers = 1)
+    Writer = ThreadPoolExecutor(max_workers = 1)
+
+    #Columns to read
+    #Function defined above.
+    UseColumns = InputColumns(EventIndex, KeepColumns)
+
+    #Participants to be read
+    ToRead = deque(ProcessID)
+
+    #Participants being read, and participants being written
+    Reads  = deque()
+    Writes = deque()
+
+    try:
+
+        while len(ToRead) != 0 or len(Reads) != 0:
+
+            #Read ahead
+            #Function defined below.
+            while len(ToRead) != 0 and len(Reads) <= Depth:
+
+                i = ToRead.popleft()
+
+                Reads.append(
+                    [i, Reader.submit(PrefetchParticipant, i,
+                                      InputDataFolder, UseColumns, Types,
+                                      InputCache)])
+
+            i, Future = Reads.popleft()
+
+            Phases = {}
+
+            Start = time.perf_counter()
+
+            Written = None
+
+            #Insert annotations and write in the background
+            #Functions defined above.
+            try:
+
+                message, Data, Phases, Start = Future.result()
+
+                if message == None:
+
+                    Data = LabelParticipant(Data, i, Annotations,
+                                            HeadingList, TrimRows, Phases)
+
+                    Written = \
+                        Writer.submit(WriteParticipant, Data, i,
+                                      InputDataFolder + "/" + str(i) + ".txt",
+                                      OutputDataFolder, OutputFormat,
+                                      EventIndex, Compression, Phases)
+
+                Data = None
+
+            except Exception as e:
+
+                message = ErrorMessage(i, e)
+
+            Writes.append([i, message, Written, Phases, Start])
+
+            #Return the participants that have been written, keeping up to
+            #Depth participants being written
+            #Function defined below.
+            while len(Writes) > Depth:
+
+                yield FinishParticipant(*Writes.popleft())
+
+        while len(Writes) != 0:
+
+            yield FinishParticipant(*Writes.popleft())
+
+    finally:
+
+        Reader.shutdown(cancel_futures = True)
+        Writer.shutdown()
+
+
+def PrefetchParticipant(i, InputDataFolder, UseColumns = None, Types = None,
+                        InputCache = None):
+
+    #Read the iMotions data file of the ith participant on a background
+    #thread (see function AnnotatePipeline). Returns a message if the file
+    #does not exist (otherwise None), the data, the phases of the
+    #participant, and the start time.
+
+    Phases = {}
+
+    Start = time.perf_counter()
+
+    path = ''.join([InputDataFolder, "/", str(i), ".txt"])
+
+    #Functions defined above
+    if not exists(path):
+
+        return [MissingMessage(i), None, Phases, Start]
+
+    Data = ReadParticipant(path, UseColumns, Types, Phases, InputCache)
+
+
+    return [None, Data, Phases, Start]
+
+
+def FinishParticipant(i, message, Written, Phases, Start):
+
+    #Wait until the file of the ith participant has been written (Written is
+    #the Future of function WriteParticipant, or None if nothing is written)
+    #and return the message and phases of the participant (see function
+    #AnnotateTry)
+
+    if Written != None:
+
+        #Function defined above
+        try:
+
+            Written.result()
+
+        except Exception as e:
+
+            message = ErrorMessage(i, e)
+
+    #Function defined in Instrumentation.py
+    AddParticipant(Phases, Start)
+
+
+    return [message, Phases]
+
+
+################################################################
+##### Define functions to annotate without writing to disk #####
+################################################################
+
+def AnnotateFrames(ExcelFile, InputDataFolder, Jobs = 1, KeepColumns = None,
+                   TrimRows = False, Float32 = False, Dtypes = None,
+                   NEvents = 11, InputCache = None, CacheFolder = None):
+
+    #Annotate the iMotions data files of InputDataFolder in memory, without
+    #writing any file, and return an iterator of (ID, Data) pairs, one per
+    #participant in the order of the Excel annotations file, where ID is the
+    #participant ID (type str) and Data is the annotated data set (a pandas
+    #DataFrame), as it would be written by function Annotate. Participants
+    #are annotated only as the iterator is consumed, so that only one
+    #participant (or, if Jobs is greater than 1, about Jobs participants) is
+    #held in memory at a time. Participants without an iMotions data file,
+    #or for whom an error occurs, are skipped with a message.
+
+    #The arguments are as in function Annotate. The compiled annotations are
+    #cached in folder CacheFolder, if specified (see function
+    #SetupAnnotations). The iterator can be passed to function
+    #AggregateFrames (see file "Aggregate.py").
+
+    #Example:
+
+    #for ID, Data in AnnotateFrames(ExcelFile, InputDataFolder):
+    #
+    #    print(ID, Data.Event.value_counts())
+
+    assert( type(ExcelFile) == str and type(InputDataFolder) == str ), \
+    "Error in AnnotateFrames: ExcelFile and InputDataFolder must be type str."
+
+    assert( type(Jobs) == int and Jobs >= 1 ), \
+    "Error in AnnotateFrames: Jobs must be an integer of 1 or greater."
+
+    assert( KeepColumns == None or \
+            (type(KeepColumns) == list and \
+             all(type(i) == str for i in KeepColumns)) ), \
+    "Error in AnnotateFrames: KeepColumns must be None or a list of str" \
+    " elements."
+
+    assert( type(TrimRows) == bool and type(Float32) == bool ), \
+    "Error in AnnotateFrames: TrimRows and Float32 must be type bool."
+
+    assert( Dtypes == None or \
+            (type(Dtypes) == dict and all(type(i) == str for i in Dtypes)) ), \
+    "Error in AnnotateFrames: Dtypes must be None or a dict with str keys."
+
+    assert( type(NEvents) == int and NEvents >= 1 ), \
+    "Error in AnnotateFrames: NEvents must be an integer of 1 or greater."
+
+    assert( InputCache == None or type(InputCache) == str ), \
+    "Error in AnnotateFrames: InputCache must be None or type str."
+
+    assert( CacheFolder == None or exists(CacheFolder) ), \
+    "Error in AnnotateFrames: The folder specified by CacheFolder does not" \
+    " appear to exist."
+
+    assert( exists(ExcelFile) ), \
+    "Error in AnnotateFrames: The file specified by ExcelFile does not" \
+    " appear to exist."
+
+    assert( exists(InputDataFolder) ), \
+    "Error in AnnotateFrames: The folder specified by InputDataFolder does" \
+    " not appear to exist."
+
+    InputDataFolder = InputDataFolder.rstrip("/\\")
+
+    #The annotations are read before the iterator is returned, so that errors
+    #in the Excel annotations file are raised here
+    #Function defined above.
+    Out = SetupAnnotations(ExcelFile, CacheFolder, NEvents)
+
+    Annotations   = Out[0]
+    HeadingList   = Out[1]
+    ParticipantID = Out[3]
+
+    #Arguments that are the same for every participant
+    #Functions defined above and in DataFiles.py.
+    Args = (InputDataFolder, Annotations, HeadingList,
+            InputColumns(None, KeepColumns), ColumnTypes(Dtypes, Float32),
+            TrimRows, InputCache)
+
+    #Function defined below
+    return AnnotatedFrames(list(ParticipantID), Jobs, Args)
+
+
+def AnnotatedFrames(ProcessID, Jobs, Args):
+
+    #Iterator of function AnnotateFrames. If Jobs is greater than 1, up to
+    #Jobs participants are annotated at the same time in a pool of processes,
+    #ahead of the participant being returned; the participants are still
+    #returned in the order of ProcessID.
+
+    #One participant at a time
+    #Function defined below.
+    if Jobs == 1:
+
+        for i in ProcessID:
+
+            message, Data = AnnotateFrame(i, *Args)
+
+            if message != None:
+
+                print(message)
+
+                continue
+
+            yield str(i), Data
+
+        return
+
+    #The arguments that are the same for every participant are passed once
+    #to each process (see function Annotate)
+    #Functions defined above and below.
+    Pool = ProcessPoolExecutor(max_workers = Jobs,
+                               initializer = SetupWorker,
+                               initargs = Args)
+
+    #Participants to be annotated, and participants being annotated
+    ToAnnotate = deque(ProcessID)
+    Annotating = deque()
+
+    try:
+
+        while len(ToAnnotate) != 0 or len(Annotating) != 0:
+
+            while len(ToAnnotate) != 0 and len(Annotating) < Jobs:
+
+                i = ToAnnotate.popleft()
+
+                Annotating.append([i, Pool.submit(AnnotateFrameWorker, i)])
+
+            i, Future = Annotating.popleft()
+
+            message, Data = Future.result()
+
+            if message != None:
+
+                print(message)
+
+                continue
+
+            yield str(i), Data
+
+    finally:
+
+        Pool.shutdown(cancel_futures = True)
+
+
+def AnnotateFrame(i, InputDataFolder, Annotations, HeadingList,
+                  UseColumns = None, Types = None, TrimRows = False,
+                  InputCache = None):
+
+    #Read and annotate the iMotions data file of the ith participant (see
+    #function AnnotateFrames). Returns a message if the participant was
+    #skipped (otherwise None) and the annotated data set (otherwise None).
+
+    path = ''.join([InputDataFolder, "/", str(i), ".txt"])
+
+    #Functions defined above
+    if not exists(path):
+
+        return [MissingMessage(i), None]
+
+    try:
+
+        Data = ReadParticipant(path, UseColumns, Types, None, InputCache)
+
+        Data = LabelParticipant(Data, i, Annotations, HeadingList, TrimRows)
+
+    except Exception as e:
+
+        return [ErrorMessage(i, e), None]
+
+
+    return [None, Data]
+
+
+def AnnotateFrameWorker(i):
+
+    #Annotate the ith participant in a worker process (see function
+    #AnnotatedFrames)
+    return AnnotateFrame(i, *WorkerArgs)
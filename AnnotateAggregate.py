@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+
+Summary
+-------
+
+Function file for function AnnotateAggregate. This file is intended to be
+called by script "StartHere_Script.py" as an alternative to calling functions
+Annotate and Aggregate one after the other. See this script for details.
+
+Function AnnotateAggregate reads each iMotions data file once, inserts the
+annotations in memory, and aggregates the annotated data directly into the
+aggregation table. Unlike running Annotate and then Aggregate, the annotated
+iMotions data files do not need to be written and then read again. Writing
+the annotated iMotions data files is optional (see OutputDataFolder below).
+
+The aggregation table has the same layout as the one written by function
+Aggregate. Its events are the column headers of the Excel annotations file
+(in chronological order) and its IDs are the participants for whom an
+iMotions data file was found.
+
+
+Inputs
+------
+
+    ExcelFile        = Full path of annotations file with extension "xlsx".
+                       Class str.
+
+                       Example:
+
+                       ExcelFile = \
+                           'C:/Users/User1/Documents/Timestamps.xlsx'
+
+    InputDataFolder  = Full path of folder that contains input iMotion data
+                       files. Class str.
+
+                       Example:
+
+                       InputDataFolder = \
+                           'C:/Users/User1/Documents/iMotionsInputs'
+
+    ExpressionNames  = List of string elements indicating the expressions to be
+                       aggregated.
+
+                       Example:
+
+                       ExpressionNames = ['Anger', 'Sadness', 'Disgust', 'Joy',
+                       'Surprise', 'Fear', 'Contempt']
+
+    AggregateFile    = Full path of file to which a table of aggregated
+                       expressions is to be written. The file extension must be
+                       ".csv". Class str.
+
+                       Example:
+
+                       AggregateFile = "C:/Users/user1/Documents/AggTable.csv"
+
+    OutputDataFolder = Optional. Full path of folder to which annotated
+                       iMotions data files will be written. If None (default),
+                       annotated iMotions data files are not written. Class str.
+
+                       Example:
+
+                       OutputDataFolder = \
+                           'C:/Users/User1/Documents/iMotionsOutputs'
+
+    OutputFormat     = Optional. Format of the annotated iMotions data files,
+                       if written: "csv" (default), "parquet", or "feather"
+                       (see function Annotate). Class str.
+
+    Compression      = Optional. Codec with which to compress the annotated
+                       iMotions data files, if written (see function
+                       Annotate). Class str.
+
+    NEvents          = Optional. Number of events in the Excel annotations
+                       file (see function Annotate). The default is 11.
+                       Class int.
+
+    Float32          = Optional. If True, the expressions are read as 32-bit
+                       rather than 64-bit floating point numbers (see
+                       function Annotate). The default is False. Class bool.
+
+    Dtypes           = Optional. Dict of column names and types, which
+                       override the known types of the columns of iMotions
+                       data files (see function Annotate). Class dict.
+
+    Statistics       = Optional. List of the statistics to compute for each
+                       expression and event (see function Aggregate). The
+                       default, None, computes only the means. Class list of
+                       str.
+
+    Layout           = Optional. Layout of the aggregation table, "wide"
+                       (default) or "long" (see function Aggregate). Class
+                       str.
+
+    BinWidth         = Optional. Width, in seconds, of time bins within each
+                       event, for which the statistics are computed (see
+                       function Aggregate). The default, None, does not bin.
+                       Class int or float.
+
+    InputCache       = Optional. Full path of a folder in which to cache the
+                       iMotions data files in a binary form (see function
+                       Annotate). The default, None, does not cache. Class
+                       str.
+
+
+Requires
+--------
+
+- Python 3
+- Pandas
+- NumPy
+- openpyxl
+- Annotate.py (custom file)
+- Aggregate.py (custom file)
+- DataFiles.py (custom file)
+
+
+Author
+------
+
+Douglas Magill
+dpm59@uakron.edu
+Suarez Behavioral Labs, College of Business, The University of Akron
+
+"""
+
+
+##### Import packages #####
+
+import numpy as np
+from pathlib import Path
+from os.path import exists
+import re
+
+from Annotate import SetupAnnotations, ReadiMotions, InsertEvents, \
+                     ErrorMessage
+from Aggregate import SetupTable, ReduceData, ReduceBins, AggregateInsert, \
+                      ConcatBins, FinishTable, ValidateAggregation
+from DataFiles import WriteData, WriteEventOrder, ColumnTypes, DataFileName, \
+                      ValidateOutputFormat
+
+
+def AnnotateAggregate(ExcelFile, InputDataFolder, ExpressionNames,
+                      AggregateFile, OutputDataFolder = None,
+                      OutputFormat = "csv", Float32 = False, Dtypes = None,
+                      Compression = None, NEvents = 11, Statistics = None,
+                      Layout = "wide", BinWidth = None, InputCache = None):
+
+
+    ####################################
+    ##### Validate input arguments #####
+    ####################################
+
+
+    ##### Argument validation #####
+
+    #Verify types and lengths:
+
+    assert( type(ExcelFile)       == str and \
+            type(InputDataFolder) == str and \
+            type(AggregateFile)   == str), \
+    "Error in AnnotateAggregate: ExcelFile, InputDataFolder, and" \
+    " AggregateFile must be type str."
+
+    assert( OutputDataFolder == None or type(OutputDataFolder) == str ), \
+    "Error in AnnotateAggregate: OutputDataFolder must be None or type str."
+
+    #Function defined in DataFiles.py
+    ValidateOutputFormat("AnnotateAggregate", OutputFormat, Compression)
+
+    assert( type(Float32) == bool ), \
+    "Error in AnnotateAggregate: Float32 must be type bool."
+
+    assert( type(NEvents) == int and NEvents >= 1 ), \
+    "Error in AnnotateAggregate: NEvents must be an integer of 1 or greater."
+
+    assert( Dtypes == None or \
+            (type(Dtypes) == dict and all(type(i) == str for i in Dtypes)) ), \
+    "Error in AnnotateAggregate: Dtypes must be None or a dict with str keys."
+
+    #Function defined in Aggregate.py
+    ValidateAggregation("AnnotateAggregate", Statistics, Layout, BinWidth)
+
+    assert( InputCache == None or type(InputCache) == str ), \
+    "Error in AnnotateAggregate: InputCache must be None or type str."
+
+    assert( type(ExpressionNames) == list and len(ExpressionNames) != 0 ), \
+    "Error in AnnotateAggregate: ExpressionNames must be type list with" \
+    " length greater than 0."
+
+    assert( all(type(i) == str for i in ExpressionNames) ), \
+    "Error in AnnotateAggregate: Elements of list ExpressionNames must be" \
+    " type str."
+
+    #Verify full directories were entered:
+
+    for i in [ExcelFile, InputDataFolder, AggregateFile, OutputDataFolder]:
+
+        if i == None:
+
+            continue
+
+        f = re.search("/", i) #find indices of forward slashes
+        b = re.search("\\\\", i) #find indices of double backward slashes
+
+        assert( not (f == None) or not (b == None) ), \
+        "Error in AnnotateAggregate: " + i + " should be a full path, e.g.," \
+        " 'C:/Users/User1/Documents/Timestamps.xlsx'."
+
+    #Verify file extensions:
+
+    assert( ExcelFile[-4:] == "xlsx" ), \
+    "Error in AnnotateAggregate: ExcelFile must have file extension '.xlsx'."
+
+    assert( AggregateFile[-3:] == "csv" ), \
+    "Error in AnnotateAggregate: The file extension of AggregateFile must be" \
+    " '.csv'."
+
+    #Verify existence of directories:
+
+    assert( exists(ExcelFile) ), \
+    "Error in AnnotateAggregate: The file specified by ExcelFile does not" \
+    " appear to exist."
+
+    assert( exists(InputDataFolder) ), \
+    "Error in AnnotateAggregate: The folder specified by InputDataFolder does" \
+    " not appear to exist."
+
+    assert( exists(str(Path(AggregateFile).parent)) ), \
+    "Error in AnnotateAggregate: The folder in which AggregateFile is" \
+    " specified to be written does not appear to exist."
+
+
+    ##### Parse folder names #####
+
+    #Remove trailing path separator if present:
+
+    InputDataFolder = InputDataFolder.rstrip("/\\")
+
+    if OutputDataFolder != None:
+
+        OutputDataFolder = OutputDataFolder.rstrip("/\\")
+
+        #Make new folder
+        #Note: function mkdir is set not to overwrite an existing folder.
+        Path(OutputDataFolder).mkdir(parents = True, exist_ok = True)
+
+
+    ##### Column names to use in iMotions data files #####
+
+    #Only "MediaTime" (to insert annotations) and the expressions to be
+    #aggregated are read, unless the annotated iMotions data files are to be
+    #written, in which case all columns are read.
+    if OutputDataFolder == None:
+
+        UseColumns = ["MediaTime"] + ExpressionNames
+
+    else:
+
+        UseColumns = None
+
+    ColumnNames = ExpressionNames.copy()
+    ColumnNames.insert(0, "Event")
+
+    #Types of the columns
+    #Function defined in DataFiles.py.
+    Types = ColumnTypes(Dtypes, Float32)
+
+
+    ##################################################
+    ##### Import and modify Excel sheet of times #####
+    ##################################################
+
+    #The compiled annotations are cached in OutputDataFolder or, if None, in
+    #the folder of AggregateFile
+    #Function defined in Annotate.py.
+    if OutputDataFolder != None:
+
+        CacheFolder = OutputDataFolder
+
+    else:
+
+        CacheFolder = str(Path(AggregateFile).parent)
+
+    Out = SetupAnnotations(ExcelFile, CacheFolder, NEvents)
+
+    Annotations   = Out[0]
+    HeadingList   = Out[1]
+    ParticipantID = Out[3]
+
+
+    #########################################
+    ##### Preallocate aggregation table #####
+    #########################################
+
+    #Only participants with an iMotions data file are included
+    PresentBoolIdx = \
+        np.array([exists(InputDataFolder + "/" + str(i) + ".txt")
+                  for i in ParticipantID], dtype = bool)
+
+    for i in ParticipantID[~ PresentBoolIdx]:
+
+        print("...iMotions data file not present for ID " + str(i) + "." + \
+              " Skipping to next file.")
+
+    ParticipantID = ParticipantID[PresentBoolIdx]
+
+    assert( ParticipantID.size != 0 ), \
+    "Error in AnnotateAggregate: No iMotions data files matching the" \
+    " participants of ExcelFile appear to be present in folder" \
+    " InputDataFolder."
+
+    #IDs as str, as in the table written by function Aggregate
+    filesArrayStr = ParticipantID.astype(str)
+
+    #Events in chronological order
+    EventsSorted = list(HeadingList)
+    NEvents      = len(EventsSorted)
+
+    #If annotated iMotions data files are written, write the events for
+    #function Aggregate
+    #Function defined in DataFiles.py.
+    if OutputDataFolder != None:
+
+        WriteEventOrder(OutputDataFolder, EventsSorted)
+
+    #Function defined in Aggregate.py
+    AggregateTable = \
+        SetupTable(filesArrayStr, EventsSorted, ColumnNames, Statistics)
+
+
+    ################################################
+    ##### Annotate and aggregate iMotions data #####
+    ################################################
+
+    print("Annotating and aggregating...")
+
+    #Tables of the bins of each file, if binned (see function
+    #AggregateToTable in "Aggregate.py")
+    BinTables = []
+
+    for i in range(0, ParticipantID.size):
+
+        fileIth = filesArrayStr[i]
+
+        #Progress notification
+        print("..." + fileIth)
+
+        try:
+
+            #Read data
+            #Function defined in Annotate.py.
+            Data = \
+                ReadiMotions(InputDataFolder + "/" + fileIth + ".txt",
+                             usecols = UseColumns, dtype = Types,
+                             InputCache = InputCache)
+
+            #Insert annotations in column "Event"
+            #Function defined in Annotate.py.
+            Data = InsertEvents(Data, ParticipantID[i], Annotations,
+                                HeadingList)
+
+            #Optionally write data file with annotations
+            #Function defined in DataFiles.py.
+            if OutputDataFolder != None:
+
+                WriteData(Data,
+                          OutputDataFolder + "/" + \
+                          DataFileName(fileIth, OutputFormat, Compression),
+                          OutputFormat,
+                          Compression = Compression)
+
+            #Aggregate events and expressions of file into table
+            #Functions defined in Aggregate.py.
+            if BinWidth == None:
+
+                Means = ReduceData(Data, ExpressionNames, EventsSorted,
+                                   Statistics)
+
+                AggregateTable = \
+                    AggregateInsert(Means, i * NEvents, ExpressionNames,
+                                    AggregateTable, Statistics)
+
+            else:
+
+                Means = ReduceBins(Data, ExpressionNames, EventsSorted,
+                                   BinWidth, Statistics)
+
+                Means.insert(0, "ID", fileIth)
+
+                BinTables.append(Means)
+
+        except Exception as e:
+
+            #Display message, including the type and description of the error
+            #Function defined in Annotate.py.
+            print(ErrorMessage(fileIth, e))
+
+            #Continue to data set of next participant
+            continue
+
+
+    ##### Write to csv #####
+
+    #Functions defined in Aggregate.py
+    if BinWidth != None:
+
+        AggregateTable = ConcatBins(BinTables, filesArrayStr, EventsSorted,
+                                    ExpressionNames, Statistics)
+
+    AggregateTable = \
+        FinishTable(AggregateTable, ExpressionNames, Statistics, Layout)
+
+    AggregateTable.to_csv(AggregateFile,
+                          index = False) #No row index (default is True)
+
+
+    ##### Completion message #####
+
+    print("\nAnnotation and aggregation operations completed." + \
+          "\nFile written to " + AggregateFile + ".\n")
@@ -0,0 +1,615 @@
+# -*- coding: utf-8 -*-
+"""
+
+Summary
+-------
+
+Function file for the benchmark of functions Annotate and Aggregate (see
+files "Annotate.py" and "Aggregate.py").
+
+Function MakeSyntheticData writes synthetic input data that have the layout
+of real input data:
+
+    - One iMotions data file per participant: a tab-separated text file with
+      5 lines before the column headers, column "MediaTime" (milliseconds
+      since webcam start, sampled at 30 Hz), and the expression columns.
+
+    - An Excel annotations file with column "Participant #", two columns
+      "Webcam Start" (clock time of webcam start), and one column per event
+      (clock time of the start of the event).
+
+Function Benchmark writes synthetic data, runs Annotate and then Aggregate
+on them, and records for each:
+
+    - The elapsed time of the whole function ("Total").
+    - The elapsed time of each phase, i.e., of each of the functions that it
+      calls (e.g., "ReadiMotions", "InsertEvents", "WriteData"), summed
+      across participants.
+    - The peak memory of the whole function and of each phase (only if
+      Memory is True, as measuring it slows the function down), both as
+      traced by Python (tracemalloc; "PeakMemoryMB") and as the peak
+      resident memory of the process ("PeakRSSMB"). Memory allocated by
+      PyArrow and by some NumPy operations is not traced by Python, but is
+      included in the resident memory. For a phase, "PeakMemoryMB" is the
+      largest increase of the traced memory during a call of the phase, and
+      "PeakRSSMB" is the peak resident memory of the process at the end of
+      the phase (which is never less than at the end of a previous phase),
+      and "RSSIncreaseMB" is the largest increase of the peak resident
+      memory during a call of the phase.
+
+The results are written to a JSON file together with the settings of the
+benchmark and the versions of Python, Pandas, NumPy, and the repository, so
+that the results of different versions can be compared (see function
+CompareBenchmarks).
+
+The benchmark can be run from a command line, e.g.,
+
+    python Benchmark.py --Participants 20 --Rows 50000 --Results Bench.json
+
+
+Requires
+--------
+
+- Python 3
+- Pandas
+- NumPy
+- openpyxl
+- Annotate.py (custom file)
+- Aggregate.py (custom file)
+- DataFiles.py (custom file)
+
+"""
+
+
+##### Import packages #####
+
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from os import devnull
+import datetime
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import tempfile
+import shutil
+import contextlib
+import openpyxl
+
+import Annotate as AnnotateModule
+import Aggregate as AggregateModule
+import DataFiles as DataFilesModule
+from DataFiles import ExpressionColumns
+from Instrumentation import PeakMemoryMB
+
+
+##### Phases #####
+
+#Functions of each step whose elapsed time is recorded, by module
+AnnotatePhases = {AnnotateModule:  ["SetupAnnotations", "ReadiMotions",
+                                    "InsertEvents", "AnnotateInsert"],
+                  DataFilesModule: ["WriteData"]}
+
+AggregatePhases = {AggregateModule: ["SetupData", "ReduceFile", "ReduceData",
+                                     "AggregateToTable"],
+                   DataFilesModule: ["ReadSchemas", "ReadData"]}
+
+
+##########################################################
+##### Define function to write synthetic input data #####
+##########################################################
+
+def MakeSyntheticData(Folder, Participants = 10, Rows = 20000, NEvents = 11,
+                      Seed = 0):
+
+    #Write synthetic iMotions data files (to subfolder "iMotionsInputs") and
+    #an Excel annotations file ("Timestamps.xlsx") to folder Folder, for
+    #Participants participants with Rows rows each and NEvents events
+    #(including "Webcam Start"). Return the full paths of the Excel
+    #annotations file and of the folder of the iMotions data files.
+
+    Rng = np.random.default_rng(Seed)
+
+    InputDataFolder = Folder + "/iMotionsInputs"
+
+    Path(InputDataFolder).mkdir(parents = True, exist_ok = True)
+
+    #Length of the recordings in seconds (30 Hz)
+    Duration = Rows / 30
+
+    Workbook = openpyxl.Workbook()
+    Sheet    = Workbook.active
+
+    Sheet.append(["Participant #", "Webcam Start", "Webcam Start"] + \
+                 ["Event " + str(j) for j in range(1, NEvents)])
+
+    for i in range(0, Participants):
+
+        ID = 4001 + i
+
+        ##### Excel annotations file #####
+
+        #Clock time of webcam start, between 9 and 10 AM
+        WebcamStart = \
+            datetime.datetime(2021, 1, 25, 9) + \
+            datetime.timedelta(seconds = int(Rng.integers(0, 3600)))
+
+        #Start times of the events, in seconds since webcam start
+        Starts = np.sort(Rng.choice(np.arange(1, int(Duration)),
+                                    size = NEvents - 1,
+                                    replace = False))
+
+        Sheet.append([ID, WebcamStart.time(), WebcamStart.time()] + \
+                     [(WebcamStart + datetime.timedelta(seconds = int(j)))
+                      .time() for j in Starts])
+
+        ##### iMotions data file #####
+
+        Data = pd.DataFrame({"StudyName": "Synthetic",
+                             "MediaTime": np.round(np.arange(Rows) * 1000 / 30,
+                                                   1)})
+
+        for j in ExpressionColumns:
+
+            Data[j] = np.round(Rng.random(Rows) * 100, 5)
+
+        with open(InputDataFolder + "/" + str(ID) + ".txt", "w",
+                  newline = "") as File:
+
+            #5 lines before the column headers, as in iMotions exports
+            for j in range(0, 5):
+
+                File.write("#Synthetic iMotions export, line " + str(j + 1) + \
+                           "\n")
+
+            Data.to_csv(File, sep = "\t", index = False)
+
+    #Format the time cells as times
+    for Row in Sheet.iter_rows(min_row = 2, min_col = 2):
+
+        for Cell in Row:
+
+            Cell.number_format = "h:mm:ss"
+
+    ExcelFile = Folder + "/Timestamps.xlsx"
+
+    Workbook.save(ExcelFile)
+
+
+    return [ExcelFile, InputDataFolder]
+
+
+############################################
+##### Define functions to time phases #####
+############################################
+
+@contextlib.contextmanager
+def TimePhases(Phases, Times, Wrapper = None):
+
+    #Within the "with" block, record the elapsed time of each call of the
+    #functions Phases (a dict of modules and lists of function names) by
+    #temporarily replacing them with timed versions. The elapsed times are
+    #summed in dict Times by function name. The time of a function includes
+    #the time of the functions it calls (e.g., the time of AnnotateInsert
+    #includes that of ReadiMotions). If Wrapper is specified (e.g.,
+    #function Traced), it is used instead of function Timed to replace the
+    #functions.
+
+    #Note: the functions are only timed when called in the current process,
+    #i.e., not in worker processes (see argument Jobs of functions Annotate
+    #and Aggregate).
+
+    #Functions to be timed, by name
+    Functions = {Name: getattr(Module, Name)
+                 for Module, Names in Phases.items() for Name in Names}
+
+    #Replace the functions in the modules that define them and in the
+    #modules that import them
+    Replaced = []
+
+    for Module in [AnnotateModule, AggregateModule, DataFilesModule]:
+
+        for Name, Function in Functions.items():
+
+            if getattr(Module, Name, None) is Function:
+
+                Replaced.append((Module, Name, Function))
+
+                setattr(Module, Name,
+                        (Wrapper or Timed)(Function, Name, Times))
+
+    try:
+
+        yield Times
+
+    finally:
+
+        for Module, Name, Function in Replaced:
+
+            setattr(Module, Name, Function)
+
+
+def Timed(Function, Name, Times):
+
+    #Return a version of Function that adds its elapsed time to Times[Name]
+
+    Times.setdefault(Name, 0.0)
+
+    def TimedFunction(*Args, **Kwargs):
+
+        Start = time.perf_counter()
+
+        try:
+
+            return Function(*Args, **Kwargs)
+
+        finally:
+
+            Times[Name] = Times[Name] + time.perf_counter() - Start
+
+    return TimedFunction
+
+
+#Traced memory (tracemalloc) at the start of each phase being run and the
+#peak traced memory so far during the phase, innermost phase last (see
+#function Traced)
+TracedPhases = []
+
+def Traced(Function, Name, Memory):
+
+    #Return a version of Function that records in Memory[Name] the largest
+    #increase of the traced memory during a call ("PeakMemoryMB"), the peak
+    #resident memory of the process at the end of the last call
+    #("PeakRSSMB"; function PeakMemoryMB in "Instrumentation.py"), and the
+    #largest increase of the peak resident memory during a call
+    #("RSSIncreaseMB"; None if it cannot be determined). Phases
+    #can be nested: the peak traced memory is reset at the start of each
+    #call, and the peak of the call is passed on to the phase that called
+    #it.
+
+    Memory.setdefault(Name, {"PeakMemoryMB": 0.0, "PeakRSSMB": None,
+                             "RSSIncreaseMB": None})
+
+    def TracedFunction(*Args, **Kwargs):
+
+        StartRSS = PeakMemoryMB()
+
+        Current, Peak = tracemalloc.get_traced_memory()
+
+        if len(TracedPhases) != 0:
+
+            TracedPhases[-1][1] = max(TracedPhases[-1][1], Peak)
+
+        tracemalloc.reset_peak()
+
+        TracedPhases.append([Current, Current])
+
+        try:
+
+            return Function(*Args, **Kwargs)
+
+        finally:
+
+            Start, Peak = TracedPhases.pop()
+
+            Peak = max(Peak, tracemalloc.get_traced_memory()[1])
+
+            if len(TracedPhases) != 0:
+
+                TracedPhases[-1][1] = max(TracedPhases[-1][1], Peak)
+
+            Memory[Name]["PeakMemoryMB"] = \
+                max(Memory[Name]["PeakMemoryMB"], (Peak - Start) / 2 ** 20)
+
+            Memory[Name]["PeakRSSMB"] = PeakMemoryMB()
+
+            if StartRSS != None:
+
+                Memory[Name]["RSSIncreaseMB"] = \
+                    max(Memory[Name]["RSSIncreaseMB"] or 0.0,
+                        Memory[Name]["PeakRSSMB"] - StartRSS)
+
+    return TracedFunction
+
+
+def Measure(Function, Args, Kwargs, Phases, Memory = False):
+
+    #Run Function and return its elapsed time ("Total") and the elapsed time
+    #of its phases or, if Memory is True, the peak memory of the function
+    #and of its phases (in MB; see function Traced). Memory is measured in a
+    #separate run, as measuring it slows down the function considerably
+    #(e.g., writing csv files).
+
+    Times = {}
+
+    #Output of the function is not displayed
+    with open(devnull, "w") as Null, contextlib.redirect_stdout(Null):
+
+        if Memory:
+
+            Memory = {}
+
+            tracemalloc.start()
+
+            try:
+
+                with TimePhases(Phases, Memory, Traced):
+
+                    Traced(Function, "Total", Memory)(*Args, **Kwargs)
+
+                return {"PeakMemoryMB": Memory["Total"]["PeakMemoryMB"],
+                        "PeakRSSMB":    Memory["Total"]["PeakRSSMB"],
+                        "Memory":       Memory}
+
+            finally:
+
+                tracemalloc.stop()
+
+        with TimePhases(Phases, Times):
+
+            Start = time.perf_counter()
+
+            Function(*Args, **Kwargs)
+
+            Times["Total"] = time.perf_counter() - Start
+
+
+    return {"Seconds": Times}
+
+
+#############################################
+##### Define function to run benchmark #####
+#############################################
+
+def Benchmark(Participants = 10, Rows = 20000, NEvents = 11, Jobs = 1,
+              OutputFormat = "csv", ChunkSize = None, Repeats = 3,
+              Memory = True, ResultsFile = None, Folder = None):
+
+    #Run functions Annotate and Aggregate Repeats times on synthetic data
+    #(see function MakeSyntheticData) and return the results. If ResultsFile
+    #is specified, the results are also written to this JSON file. If Folder
+    #is specified, the synthetic data and outputs are written to this folder
+    #and kept; otherwise, they are written to a temporary folder, which is
+    #removed afterwards.
+
+    #The elapsed times of the phases are only recorded if Jobs is 1, as the
+    #phases otherwise run in worker processes. If Memory is True, the peak
+    #memory of the functions and of their phases is measured in one more run
+    #after the timed runs (and only for the current process). Each run writes
+    #to new output folders, so that no cache (e.g., Manifest.json) is used.
+
+    assert( type(Repeats) == int and Repeats >= 1 ), \
+    "Error in Benchmark: Repeats must be an integer of 1 or greater."
+
+    Temporary = Folder == None
+
+    if Temporary:
+
+        Folder = tempfile.mkdtemp(prefix = "iMotionsBenchmark")
+
+    Folder = Folder.rstrip("/\\")
+
+    try:
+
+        ExcelFile, InputDataFolder = \
+            MakeSyntheticData(Folder, Participants, Rows, NEvents)
+
+        Runs = []
+
+        for k in range(0, Repeats + (1 if Memory else 0)):
+
+            OutputDataFolder = Folder + "/iMotionsOutputs" + str(k)
+            AggregateFile    = Folder + "/AggTable" + str(k) + ".csv"
+
+            Path(OutputDataFolder).mkdir(parents = True, exist_ok = True)
+
+            Runs.append(
+                {"Annotate":
+                     Measure(AnnotateModule.Annotate,
+                             (ExcelFile, InputDataFolder, OutputDataFolder),
+                             {"Jobs":         Jobs,
+                              "ChunkSize":    ChunkSize,
+                              "OutputFormat": OutputFormat,
+                              "NEvents":      NEvents,
+                              "Incremental":  False},
+                             AnnotatePhases, k == Repeats),
+                 "Aggregate":
+                     Measure(AggregateModule.Aggregate,
+                             (ExpressionColumns, OutputDataFolder,
+                              AggregateFile),
+                             {"Jobs": Jobs},
+                             AggregatePhases, k == Repeats)})
+
+    finally:
+
+        if Temporary:
+
+            shutil.rmtree(Folder, ignore_errors = True)
+
+    Results = \
+        {"Settings": {"Participants": Participants,
+                      "Rows":         Rows,
+                      "NEvents":      NEvents,
+                      "Jobs":         Jobs,
+                      "OutputFormat": OutputFormat,
+                      "ChunkSize":    ChunkSize,
+                      "Repeats":      Repeats},
+         "Environment": Environment(),
+         "Runs": Runs,
+         "Summary": Summarize(Runs)}
+
+    if ResultsFile != None:
+
+        with open(ResultsFile, "w") as File:
+
+            json.dump(Results, File, indent = 1)
+
+
+    return Results
+
+
+def Summarize(Runs):
+
+    #Return the minimum across repeats of each elapsed time, which is the
+    #least affected by other activity on the computer, and the peak memory
+    #of the function and of its phases
+
+    Summary = {}
+
+    for Step in ["Annotate", "Aggregate"]:
+
+        TimedRuns = \
+            [Run[Step]["Seconds"] for Run in Runs if "Seconds" in Run[Step]]
+
+        Summary[Step] = \
+            {"Seconds": {i: min(Times[i] for Times in TimedRuns)
+                         for i in TimedRuns[0]}}
+
+        for Run in Runs:
+
+            for i in ["PeakMemoryMB", "PeakRSSMB", "Memory"]:
+
+                if i in Run[Step]:
+
+                    Summary[Step][i] = Run[Step][i]
+
+
+    return Summary
+
+
+def Environment():
+
+    #Return the versions of Python, Pandas, and NumPy, the platform, the
+    #date, and, if available, the git commit of the repository
+
+    try:
+
+        Commit = \
+            subprocess.run(["git", "rev-parse", "HEAD"],
+                           cwd = str(Path(__file__).parent),
+                           capture_output = True, text = True,
+                           check = True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+
+        Commit = None
+
+    return {"Python":   platform.python_version(),
+            "Pandas":   pd.__version__,
+            "NumPy":    np.__version__,
+            "Platform": platform.platform(),
+            "Date":     datetime.datetime.now().isoformat(timespec = "seconds"),
+            "Commit":   Commit}
+
+
+##############################################
+##### Define function to compare results #####
+##############################################
+
+def CompareBenchmarks(OldFile, NewFile):
+
+    #Print the elapsed times and peak memory of two results files written by
+    #function Benchmark (e.g., of two versions) side by side, with the ratio
+    #of new to old. Return the comparison as a dataframe.
+
+    with open(OldFile, "r") as File:
+
+        Old = json.load(File)["Summary"]
+
+    with open(NewFile, "r") as File:
+
+        New = json.load(File)["Summary"]
+
+    Rows = []
+
+    for Step in ["Annotate", "Aggregate"]:
+
+        for i in New[Step]["Seconds"]:
+
+            Rows.append([Step, i + " (s)",
+                         Old[Step]["Seconds"].get(i, np.nan),
+                         New[Step]["Seconds"][i]])
+
+        if "PeakMemoryMB" in New[Step] and "PeakMemoryMB" in Old[Step]:
+
+            Rows.append([Step, "Peak memory (MB)",
+                         Old[Step]["PeakMemoryMB"],
+                         New[Step]["PeakMemoryMB"]])
+
+        #The resident memory is None if it cannot be determined
+        if New[Step].get("PeakRSSMB") != None and \
+           Old[Step].get("PeakRSSMB") != None:
+
+            Rows.append([Step, "Peak resident memory (MB)",
+                         Old[Step]["PeakRSSMB"],
+                         New[Step]["PeakRSSMB"]])
+
+        #Memory of each phase
+        for i in New[Step].get("Memory", {}):
+
+            if i == "Total":
+
+                continue
+
+            OldPhase = Old[Step].get("Memory", {}).get(i, {})
+
+            Rows.append([Step, i + " memory (MB)",
+                         OldPhase.get("PeakMemoryMB", np.nan),
+                         New[Step]["Memory"][i]["PeakMemoryMB"]])
+
+            if New[Step]["Memory"][i]["RSSIncreaseMB"] != None and \
+               OldPhase.get("RSSIncreaseMB") != None:
+
+                Rows.append([Step, i + " resident memory increase (MB)",
+                             OldPhase["RSSIncreaseMB"],
+                             New[Step]["Memory"][i]["RSSIncreaseMB"]])
+
+    Comparison = pd.DataFrame(Rows, columns = ["Step", "Measure", "Old", "New"])
+
+    Comparison["Ratio"] = Comparison.New / Comparison.Old
+
+    print(Comparison.to_string(index = False))
+
+
+    return Comparison
+
+
+##### Run from a command line #####
+
+if __name__ == "__main__":
+
+    import argparse
+
+    Parser = argparse.ArgumentParser(
+        description = "Benchmark Annotate and Aggregate on synthetic data.")
+
+    Parser.add_argument("--Participants", type = int, default = 10)
+    Parser.add_argument("--Rows",         type = int, default = 20000)
+    Parser.add_argument("--NEvents",      type = int, default = 11)
+    Parser.add_argument("--Jobs",         type = int, default = 1)
+    Parser.add_argument("--OutputFormat", default = "csv")
+    Parser.add_argument("--ChunkSize",    type = int, default = None)
+    Parser.add_argument("--Repeats",      type = int, default = 3)
+    Parser.add_argument("--NoMemory",     action = "store_true")
+    Parser.add_argument("--Results",      default = None)
+    Parser.add_argument("--Folder",       default = None)
+    Parser.add_argument("--Compare",      nargs = 2, default = None,
+                        metavar = ("OLD", "NEW"))
+
+    Arguments = Parser.parse_args()
+
+    if Arguments.Compare != None:
+
+        CompareBenchmarks(*Arguments.Compare)
+
+    else:
+
+        Results = Benchmark(Arguments.Participants, Arguments.Rows,
+                            Arguments.NEvents, Arguments.Jobs,
+                            Arguments.OutputFormat, Arguments.ChunkSize,
+                            Arguments.Repeats, not Arguments.NoMemory,
+                            Arguments.Results, Arguments.Folder)
+
+        print(json.dumps(Results["Summary"], indent = 1))
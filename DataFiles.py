@@ -0,0 +1,1073 @@
+# -*- coding: utf-8 -*-
+"""
+
+Summary
+-------
+
+Function file for the functions that write and read annotated iMotions data
+files. These functions are called by functions Annotate, Aggregate, and
+AnnotateAggregate (see files "Annotate.py", "Aggregate.py", and
+"AnnotateAggregate.py").
+
+Annotated iMotions data files can be written in one of the following formats,
+which is determined by the file extension:
+
+    "csv"     = Comma-separated text file (extension ".csv"). This is the
+                default format.
+
+    "parquet" = Apache Parquet file (extension ".parquet"). A compressed,
+                columnar binary format.
+
+    "feather" = Feather file, i.e., an Apache Arrow IPC file (extension
+                ".feather"). An uncompressed, columnar binary format that is
+                very fast to read and write.
+
+Annotated iMotions data files can also be compressed (see Compressions
+below). Compressed csv files have a second extension for the codec, e.g.,
+".csv.gz" (gzip) or ".csv.zst" (zstd), and are decompressed when read. The
+binary formats are compressed internally and keep their extension.
+
+The binary formats store each column separately, so the columns needed for
+aggregation (the expressions and "Event") can be read without reading the
+other columns, and no text has to be parsed. Column "Event" is stored as a
+dictionary-encoded (categorical) column, i.e., each row holds a small integer
+code rather than the text of the event. Unlike the csv format, the row index
+is not written.
+
+Instead of annotated iMotions data files, function Annotate can write event
+index files (see argument EventIndex of function Annotate). An event index
+file lists, for each participant, the rows of the original iMotions data file
+that belong to each event:
+
+    "ID"         = Participant ID.
+    "Event"      = Event label.
+    "StartTime"  = MediaTime of the first row of the event.
+    "EndTime"    = MediaTime of the last row of the event.
+    "StartRow"   = Row offset of the first row of the event within the data
+                   of the original iMotions data file (0 is the first row
+                   after the column headers).
+    "EndRow"     = Row offset of the row after the last row of the event.
+    "SourceFile" = Full path of the original iMotions data file.
+
+Event index files are either one file per participant (named, e.g.,
+"4001.events.csv") or one file for all participants ("EventIndex.csv").
+
+Text files, i.e., the original (tab-delimited) iMotions data files and
+annotated iMotions data files in the csv format, are read by function
+ReadTable with one of the following engines (see CsvEngine below):
+
+    "pyarrow" = The csv reader of PyArrow, which parses a file with several
+                threads at the same time. This is the default if PyArrow is
+                installed. Numbers are parsed exactly (as with option
+                float_precision = "round_trip" of pandas), so a value can
+                differ from that of the "pandas" engine in its last digit.
+                Files that this engine cannot read the same way as pandas
+                (e.g., files with columns of a type other than float or
+                category specified) are read with the "pandas" engine, with
+                numbers also parsed exactly. Files read in chunks (see
+                argument ChunkSize of function Annotate) are read with the
+                "pandas" engine in the same way, so that the data are the
+                same whether read in chunks or not.
+
+    "pandas"  = The csv reader of pandas, which parses a file with one
+                thread. This is the default if PyArrow is not installed.
+
+The original iMotions data files can also be cached in a binary form (see
+argument InputCache of functions Annotate and Aggregate). The cache of a file
+is a folder in the cache folder that holds one NumPy file (".npy") per
+column, e.g., "0.npy" for the first column, and a manifest ("Columns.json")
+with the name and type of each column, the types with which the file was
+read (e.g., float32 if argument Float32 is True), and the size and
+modification time of the original file. Numeric columns are stored as arrays
+of numbers; text columns are stored as arrays of integer codes, with the text
+of each code in the manifest. The NumPy files are memory-mapped when read,
+i.e., the data are not copied or parsed. The cache of a file is written the
+first time the file is read, and written again if the size or modification
+time of the file, or the types with which it is read, change.
+
+The participants can be split into shards (see argument Shard of functions
+Annotate and Aggregate), e.g., to annotate and aggregate a study on several
+machines. Shard "k/n" is the kth of n shards (k from 1 to n). A participant
+belongs to the shard given by a checksum (CRC-32) of its ID, so the shard of
+a participant is the same on every machine and does not depend on which
+other participants are present.
+
+
+Requires
+--------
+
+- Python 3
+- Pandas
+- PyArrow (only for the "parquet" and "feather" formats and the "pyarrow"
+  engine for text files)
+- zstandard (only for csv files compressed with zstd)
+
+"""
+
+
+##### Import packages #####
+
+import pandas as pd
+import numpy as np
+from os import replace, stat, remove, getpid
+from os.path import exists, abspath, basename
+from pathlib import Path
+import hashlib
+import csv
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+#PyArrow is optional; it is only required for the binary formats
+try:
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.csv as pacsv
+
+except ImportError:
+
+    pa    = None
+    pq    = None
+    pacsv = None
+
+#zstandard is optional; it is only required for csv files compressed with zstd
+try:
+
+    import zstandard
+
+except ImportError:
+
+    zstandard = None
+
+
+##### File formats #####
+
+#File extension of each format
+DataFileExtensions = {"csv":     ".csv",
+                      "parquet": ".parquet",
+                      "feather": ".feather"}
+
+#Compression codecs of each format
+#"lz4" is faster and "zstd" compresses more than "gzip".
+Compressions = {"csv":     ["gzip", "zstd"],
+                "parquet": ["snappy", "gzip", "zstd", "lz4"],
+                "feather": ["zstd", "lz4"]}
+
+#Second file extension of compressed csv files
+CompressionExtensions = {"gzip": ".gz",
+                         "zstd": ".zst"}
+
+#File extension of event index files for one participant
+EventIndexExtension = ".events.csv"
+
+#File name of event index file for all participants
+EventIndexFile = "EventIndex.csv"
+
+#File name of the list of events in chronological order
+EventOrderFile = "Events.json"
+
+#Engines with which text files can be read (see function ReadTable)
+CsvEngines = ["pandas", "pyarrow"]
+
+#Engine with which text files are read
+#To always use pandas, e.g., to compare results with those of earlier
+#versions, set DataFiles.CsvEngine = "pandas" before calling functions
+#Annotate or Aggregate.
+CsvEngine = "pandas" if pacsv == None else "pyarrow"
+
+#Text that is read as missing by either engine, as by default with pandas
+#(see option na_values of pandas.read_csv)
+NullValues = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN",
+              "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN",
+              "None", "n/a", "nan", "null"]
+
+
+##### Column types #####
+
+#Expression columns of iMotions data files
+ExpressionColumns = ["Anger", "Sadness", "Disgust", "Joy", "Surprise", "Fear",
+                     "Contempt", "Valence", "Engagement", "Attention"]
+
+#Types of the known columns of iMotions data files (and of annotated iMotions
+#data files)
+#Columns that are not listed are inferred when read.
+iMotionsColumnTypes = {"MediaTime": "float64", "Event": "category"}
+
+iMotionsColumnTypes.update({i: "float64" for i in ExpressionColumns})
+
+
+def ColumnTypes(Dtypes = None, Float32 = False):
+
+    #Return the types of the columns of iMotions data files to be used when
+    #reading them: the known types (iMotionsColumnTypes), with the expression
+    #columns as float32 if Float32 is True, overridden by Dtypes (a dict of
+    #column names and types) if specified.
+
+    Types = iMotionsColumnTypes.copy()
+
+    if Float32:
+
+        Types.update({i: "float32" for i in ExpressionColumns})
+
+    if Dtypes != None:
+
+        Types.update(Dtypes)
+
+
+    return Types
+
+
+#######################################################
+##### Define function to determine format of file #####
+#######################################################
+
+def DataFileFormat(fileName):
+
+    #Return the format of a file (see DataFileExtensions) based upon its
+    #extension, or None if the file is not in one of these formats.
+
+    Extension = DataFileExtension(fileName)
+
+    if Extension == None:
+
+        return None
+
+    for Format in DataFileExtensions:
+
+        if Extension.startswith(DataFileExtensions[Format]):
+
+            return Format
+
+
+def DataFileExtension(fileName):
+
+    #Return the extension of a data file, including the extension of the
+    #compression codec of compressed csv files (e.g., ".csv.gz"), or None if
+    #the file is not in one of the formats.
+
+    #Event index files are not data files
+    if IsEventIndex(fileName):
+
+        return None
+
+    Extensions = list(DataFileExtensions.values()) + \
+                 [".csv" + i for i in CompressionExtensions.values()]
+
+    for Extension in Extensions:
+
+        if fileName.lower().endswith(Extension):
+
+            return Extension
+
+    return None
+
+
+def DataFileName(ID, Format, Compression = None):
+
+    #Return the name of the data file of participant ID in format Format,
+    #compressed with codec Compression (see Compressions) if specified.
+
+    Extension = DataFileExtensions[Format]
+
+    if Format == "csv" and Compression != None:
+
+        Extension = Extension + CompressionExtensions[Compression]
+
+    return str(ID) + Extension
+
+
+def RemoveDataFiles(Folder, ID, Keep):
+
+    #Remove the data files of participant ID in folder Folder other than file
+    #Keep, e.g., "4001.csv" written by an earlier run with another format
+    #than "4001.parquet" or with another compression than "4001.csv.gz".
+    #Otherwise function Aggregate would find more than one data file of the
+    #participant.
+
+    fileNames = [DataFileName(ID, Format) for Format in DataFileExtensions] + \
+                [DataFileName(ID, "csv", Compression)
+                 for Compression in CompressionExtensions]
+
+    for fileName in fileNames:
+
+        if fileName != Keep and exists(Folder + "/" + fileName):
+
+            remove(Folder + "/" + fileName)
+
+
+def IsEventIndex(fileName):
+
+    #Return whether a file is an event index file
+
+    return fileName.lower().endswith(EventIndexExtension) or \
+           fileName.replace("\\", "/").split("/")[-1] == EventIndexFile
+
+
+def DataFileID(fileName):
+
+    #Return the name of a file without the extension of its format, e.g.,
+    #"4001" for "4001.parquet".
+
+    Extension = DataFileExtension(fileName)
+
+    if Extension == None:
+
+        return fileName
+
+    return fileName[: -len(Extension)]
+
+
+################################################
+##### Define functions to write data files #####
+################################################
+
+def ValidateOutputFormat(Function, OutputFormat, Compression = None):
+
+    #Verify arguments OutputFormat and Compression of function Function
+    #(e.g., "Annotate"), and that the packages they require are installed
+
+    assert( OutputFormat in DataFileExtensions ), \
+    "Error in " + Function + ": OutputFormat must be one of " + \
+    ", ".join(DataFileExtensions) + "."
+
+    assert( Compression == None or \
+            Compression in Compressions[OutputFormat] ), \
+    "Error in " + Function + ": Compression must be None or, for" \
+    " OutputFormat '" + OutputFormat + "', one of " + \
+    ", ".join(Compressions[OutputFormat]) + "."
+
+    assert( not (OutputFormat == "csv" and Compression == "zstd") or \
+            zstandard != None ), \
+    "Error in " + Function + ": Package zstandard, which is required for" \
+    " Compression 'zstd' of csv files, does not appear to be installed."
+
+    assert( OutputFormat == "csv" or pa != None ), \
+    "Error in " + Function + ": Package PyArrow, which is required for" \
+    " OutputFormat '" + OutputFormat + "', does not appear to be installed."
+
+
+def WriteData(Data, path, Format, Chunk = None, Writer = None,
+              Compression = None):
+
+    #Write a dataframe to a file of format Format, compressed with codec
+    #Compression (see Compressions) if specified.
+
+    #To write a file in chunks, call the function once per chunk with Chunk
+    #set to the number of the chunk (0 for the first) and Writer set to the
+    #value returned by the previous call (None for the first chunk). Then,
+    #after the last chunk, call function CloseWriter. For the csv format,
+    #chunks are appended to the file; for the binary formats, each chunk is
+    #written as a separate row group (parquet) or record batch (feather) of
+    #the same file. If Chunk is None, the whole file is written at once.
+
+    if Format == "csv":
+
+        #Write (whole file or first chunk) or append (remaining chunks)
+        #Each chunk of a compressed file is compressed separately; the file
+        #is read as if it were compressed at once.
+        Data.to_csv(path,
+                    mode = "w" if not Chunk else "a",
+                    header = not Chunk,
+                    compression = Compression)
+
+        return None
+
+    #Convert to an Arrow table
+    #The row index is not kept. Categorical columns (e.g., "Event") are
+    #converted to dictionary-encoded columns.
+    Table = pa.Table.from_pandas(Data, preserve_index = False)
+
+    #The writer is kept together with the column types (schema) of the first
+    #chunk, which are used for all chunks.
+    if Writer == None:
+
+        if Format == "parquet":
+
+            Writer = [pq.ParquetWriter(path, Table.schema,
+                                       compression = Compression or "snappy"),
+                      Table.schema]
+
+        else:
+
+            Options = pa.ipc.IpcWriteOptions(compression = Compression)
+
+            Writer = [pa.ipc.new_file(path, Table.schema, options = Options),
+                      Table.schema]
+
+    else:
+
+        Table = Table.cast(Writer[1])
+
+    Writer[0].write_table(Table)
+
+    #If the whole file was written at once
+    if Chunk == None:
+
+        Writer[0].close()
+
+        return None
+
+    return Writer
+
+
+def CloseWriter(Writer):
+
+    #Finish a file written in chunks by function WriteData
+
+    if Writer != None:
+
+        Writer[0].close()
+
+
+def WriteEventOrder(Folder, Events):
+
+    #Write the events, in chronological order, to folder Folder, so that the
+    #order is known without reading the data files. The events are the
+    #column headers of the Excel annotations file (see function
+    #SetupAnnotations in "Annotate.py").
+
+    with open(Folder + "/" + EventOrderFile, "w") as File:
+
+        json.dump({"Events": [str(i) for i in Events]}, File, indent = 1)
+
+
+###############################################
+##### Define functions to read data files #####
+###############################################
+
+def ReadTable(path, sep = ",", skiprows = 0, usecols = None, dtype = None):
+
+    #Read a text file (e.g., csv or tab-delimited) into a dataframe with the
+    #engine set by CsvEngine (see above). The first skiprows lines (e.g., the
+    #5-line preamble of iMotions data files) are skipped, and the next line
+    #holds the column headers. Arguments usecols and dtype are as in function
+    #ReadData.
+
+    #Function defined below
+    if CsvEngine == "pyarrow":
+
+        Data = ReadTableArrow(path, sep, skiprows, usecols, dtype)
+
+        if Data is not None:
+
+            return Data
+
+    return pd.read_csv(path,
+                       sep = sep,
+                       skiprows = skiprows,
+                       usecols = usecols,
+                       dtype = dtype,
+                       float_precision = FloatPrecision(),
+                       memory_map = True) #default False
+
+
+def FloatPrecision():
+
+    #Return option float_precision of pandas.read_csv with which numbers are
+    #parsed as by the engine set by CsvEngine: exactly ("round_trip") for
+    #"pyarrow", and with the default parser of pandas (None) for "pandas".
+    #Used whenever pandas reads a text file in place of PyArrow (e.g., in
+    #chunks), so that the data do not depend on how the file is read.
+
+    return "round_trip" if CsvEngine == "pyarrow" else None
+
+
+def ReadTableCached(path, CacheFolder, sep = ",", skiprows = 0, usecols = None,
+                    dtype = None):
+
+    #Read a text file (see function ReadTable) from its cache in folder
+    #CacheFolder (see function ReadInputCache). If the file is not cached,
+    #has changed since it was cached, or was cached with other types than
+    #dtype, all of its columns are read, with types dtype, and cached; the
+    #columns usecols are then returned. The data are thus the same whether
+    #or not the file was already cached.
+
+    #Function defined below
+    Data = ReadInputCache(path, CacheFolder, usecols, dtype)
+
+    if Data is not None:
+
+        return Data
+
+    Stat = stat(path)
+
+    #Functions defined above and below
+    Data = ReadTable(path, sep, skiprows, dtype = dtype)
+
+    WriteInputCache(Data, path, CacheFolder, Stat, dtype)
+
+    if usecols != None:
+
+        #If a column is not present, pandas raises the error
+        if not all(i in Data.columns for i in usecols):
+
+            return ReadTable(path, sep, skiprows, usecols, dtype)
+
+        Data = Data[[i for i in Data.columns if i in usecols]]
+
+
+    return CastColumns(Data, dtype)
+
+
+def CastColumns(Data, dtype = None):
+
+    #Convert the columns of Data that are in dtype (a dict of column names
+    #and types) and whose type differs
+
+    if dtype == None:
+
+        return Data
+
+    return Data.astype({i: dtype[i] for i in Data.columns
+                        if i in dtype and Data[i].dtype != dtype[i]})
+
+
+def ReadTableArrow(path, sep = ",", skiprows = 0, usecols = None,
+                   dtype = None):
+
+    #Read a text file with the csv reader of PyArrow (see function ReadTable).
+    #Returns None if the file cannot be read the same way as with pandas, in
+    #which case it is read with pandas instead.
+
+    #Column headers as named by pandas
+    #Blank headers are named, e.g., "Unnamed: 0" and repeated headers, e.g.,
+    #"Anger.1". These names are given to PyArrow, so that the columns have
+    #the same names with either engine.
+    Names = list(pd.read_csv(path, sep = sep, skiprows = skiprows,
+                             nrows = 0).columns)
+
+    #Columns to read, in the order of the file as with pandas
+    #If a column is not present, pandas raises the error.
+    if usecols != None:
+
+        if not all(i in Names for i in usecols):
+
+            return None
+
+        Columns = [i for i in Names if i in usecols]
+
+    else:
+
+        Columns = Names
+
+    #Types of the columns
+    #Floating point columns are parsed as the type specified and categorical
+    #columns are read as text and then converted. Columns of other types are
+    #read with pandas.
+    Types = {}
+    Categories = []
+
+    for i in Columns:
+
+        if dtype == None or not (i in dtype):
+
+            continue
+
+        if str(dtype[i]) == "category":
+
+            Types[i] = pa.string()
+
+            Categories.append(i)
+
+        elif pd.api.types.is_float_dtype(dtype[i]):
+
+            Types[i] = pa.from_numpy_dtype(np.dtype(dtype[i]))
+
+        else:
+
+            return None
+
+    try:
+
+        Table = ReadArrowTable(path, sep, skiprows, Names, Columns, Types)
+
+        #Text that PyArrow infers to be dates or times is kept as text, as
+        #with pandas
+        Temporal = [Field.name for Field in Table.schema
+                    if pa.types.is_temporal(Field.type)]
+
+        if len(Temporal) != 0:
+
+            Types.update({i: pa.string() for i in Temporal})
+
+            Table = ReadArrowTable(path, sep, skiprows, Names, Columns, Types)
+
+    #E.g., rows with more or fewer fields than there are column headers
+    except pa.ArrowInvalid:
+
+        return None
+
+    Data = Table.to_pandas()
+
+    for i in Categories:
+
+        Data[i] = Data[i].astype("category")
+
+
+    return Data
+
+
+def ReadArrowTable(path, sep, skiprows, Names, Columns, Types):
+
+    #Read columns Columns of a text file, with column headers Names, into a
+    #PyArrow table (see function ReadTableArrow). Empty fields, as well as
+    #"NA", "NaN", "None", and the other text that pandas reads as missing
+    #(NullValues), are missing.
+
+    return pacsv.read_csv(
+               path,
+               read_options = \
+                   pacsv.ReadOptions(skip_rows = skiprows + 1,
+                                     column_names = Names),
+               parse_options = pacsv.ParseOptions(delimiter = sep),
+               convert_options = \
+                   pacsv.ConvertOptions(include_columns = Columns,
+                                        column_types = Types,
+                                        null_values = NullValues,
+                                        strings_can_be_null = True))
+
+
+def ReadColumns(path):
+
+    #Return the column names of a data file without reading its data.
+
+    Format = DataFileFormat(path)
+
+    if Format == "parquet":
+
+        return list(pq.read_schema(path).names)
+
+    if Format == "feather":
+
+        with pa.memory_map(path) as Source:
+
+            return list(pa.ipc.open_file(Source).schema.names)
+
+    #Compressed csv files are decompressed to read the column headers
+    if DataFileExtension(path) != DataFileExtensions["csv"]:
+
+        return list(pd.read_csv(path, nrows = 0).columns)
+
+    #Read only the first line of the file (the column headers)
+    #A blank header (e.g., of the row index) is returned as "".
+    with open(path, "r", newline = "", encoding = "utf-8-sig") as File:
+
+        return next(csv.reader([File.readline()]), [])
+
+
+#File name of the cache of column names of data files, which is written to
+#the folder of the data files
+SchemaCacheName = "SchemaCache.json"
+
+def TempFileName(fileName):
+
+    #Return the name of the temporary file to which file fileName is written
+    #before it replaces fileName. The name includes the ID of the process, so
+    #that processes that write the same file at the same time (e.g., shards
+    #on a shared folder; see argument Shard of function Aggregate) do not
+    #write to the same temporary file.
+
+    return fileName + "." + str(getpid()) + ".tmp"
+
+
+def ReadSchemas(Folder, fileNames, Threads = 8):
+
+    #Return a dict with the column names of each data file among fileNames,
+    #which are names of files in folder Folder. Files that are not in a data
+    #file format, and binary data files if PyArrow is not installed, are not
+    #included.
+
+    #The column names are read by function ReadColumns, Threads files at the
+    #same time. They are cached together with the size and modification time
+    #of each file; the column names of a file whose size and modification
+    #time have not changed are taken from the cache rather than read again.
+
+    CacheFile = Folder + "/" + SchemaCacheName
+
+    Cache = {}
+
+    if exists(CacheFile):
+
+        try:
+
+            with open(CacheFile, "r") as File:
+
+                Cache = json.load(File)
+
+        except ValueError:
+
+            Cache = {}
+
+    Schemas = {}
+    ToRead  = []
+
+    for i in fileNames:
+
+        Format = DataFileFormat(i)
+
+        if Format == None or (Format != "csv" and pa == None):
+
+            continue
+
+        Stat  = stat(Folder + "/" + i)
+        Entry = Cache.get(i)
+
+        if Entry != None and Entry["Size"]  == Stat.st_size and \
+                             Entry["MTime"] == Stat.st_mtime_ns:
+
+            Schemas[i] = Entry
+
+        else:
+
+            Schemas[i] = {"Size":  Stat.st_size,
+                          "MTime": Stat.st_mtime_ns}
+
+            ToRead.append(i)
+
+    #Read the column names of new or changed files
+    with ThreadPoolExecutor(max_workers = Threads) as Pool:
+
+        Columns = Pool.map(ReadColumns, [Folder + "/" + i for i in ToRead])
+
+        for i, Columns_i in zip(ToRead, Columns):
+
+            Schemas[i]["Columns"] = Columns_i
+
+    #Entries of the cache for files that are not among fileNames but still
+    #exist are kept, e.g., the files of other shards (see argument Shard of
+    #function Aggregate)
+    Update = {i: Cache[i] for i in Cache
+              if not (i in Schemas) and exists(Folder + "/" + i)}
+
+    Update.update(Schemas)
+
+    #Update the cache if any file was added, changed, or removed
+    #The cache is not updated if the folder cannot be written to.
+    if len(ToRead) != 0 or Update.keys() != Cache.keys():
+
+        try:
+
+            with open(TempFileName(CacheFile), "w") as File:
+
+                json.dump(Update, File)
+
+            replace(TempFileName(CacheFile), CacheFile)
+
+        except OSError:
+
+            pass
+
+
+    return {i: set(Schemas[i]["Columns"]) for i in Schemas}
+
+
+def ReadData(path, usecols = None, dtype = None):
+
+    #Read a data file. If usecols is specified, only these columns are read;
+    #for the binary formats, the other columns are not read from disk at all.
+    #Compressed files are decompressed (csv files based upon their extension).
+    #If dtype (a dict of column names and types; see function ColumnTypes) is
+    #specified, the columns present are read as or converted to these types.
+
+    Format = DataFileFormat(path)
+
+    #Function defined above
+    if Format == "csv":
+
+        return ReadTable(path, usecols = usecols, dtype = dtype)
+
+    if Format == "parquet":
+
+        Data = pd.read_parquet(path, columns = usecols)
+
+    else:
+
+        Data = pd.read_feather(path, columns = usecols)
+
+    #The binary formats store the type of each column; convert only the
+    #columns whose type differs
+    #Function defined above.
+    return CastColumns(Data, dtype)
+
+
+def ReadEventOrder(Folder):
+
+    #Return the events, in chronological order, written to folder Folder by
+    #function WriteEventOrder, or None if they were not written (or cannot be
+    #read).
+
+    if not exists(Folder + "/" + EventOrderFile):
+
+        return None
+
+    try:
+
+        with open(Folder + "/" + EventOrderFile, "r") as File:
+
+            Events = json.load(File)["Events"]
+
+    except (ValueError, KeyError, TypeError):
+
+        return None
+
+    if type(Events) != list or len(Events) == 0 or \
+       not all(type(i) == str for i in Events):
+
+        return None
+
+
+    return Events
+
+
+def ReadEventIndex(Folder, fileNames):
+
+    #Read the event index files (see function IsEventIndex) among fileNames,
+    #which are names of files in folder Folder, into one dataframe. Return
+    #None if there are no event index files.
+
+    Files = [Folder + "/" + i for i in fileNames if IsEventIndex(i)]
+
+    if len(Files) == 0:
+
+        return None
+
+    #IDs are read as str, as in the aggregation table
+    return pd.concat([pd.read_csv(i, dtype = {"ID": str}) for i in Files],
+                     ignore_index = True)
+
+
+#########################################################
+##### Define functions to cache iMotions data files #####
+#########################################################
+
+#File name of the manifest of the cache of a file
+InputCacheManifest = "Columns.json"
+
+#Version of the layout of the cache; caches of another version are written
+#again
+InputCacheVersion = 2
+
+def InputCacheFolder(path, CacheFolder):
+
+    #Return the folder, within folder CacheFolder, of the cache of file path
+    #The folder is named after the file and a hash of its full path, so that
+    #files with the same name in different folders have different caches.
+
+    Hash = hashlib.sha1(abspath(path).encode("utf-8")).hexdigest()[:12]
+
+    return CacheFolder + "/" + basename(path) + "." + Hash
+
+
+def ReadInputCache(path, CacheFolder, usecols = None, dtype = None):
+
+    #Return the data of file path from its cache in folder CacheFolder, or
+    #None if the file is not cached, has changed since it was cached, or was
+    #cached with other types than dtype (see function WriteInputCache).
+    #Arguments usecols and dtype are as in function ReadData.
+
+    Folder = InputCacheFolder(path, CacheFolder)
+
+    try:
+
+        with open(Folder + "/" + InputCacheManifest, "r") as File:
+
+            Manifest = json.load(File)
+
+    except (OSError, ValueError):
+
+        return None
+
+    Stat = stat(path)
+
+    #Function defined below
+    if Manifest.get("Version") != InputCacheVersion or \
+       Manifest.get("Size")    != Stat.st_size or \
+       Manifest.get("MTime")   != Stat.st_mtime_ns or \
+       Manifest.get("Types")   != InputCacheTypes(dtype):
+
+        return None
+
+    Columns = Manifest["Columns"]
+
+    #Columns to read, in the order of the file
+    #If a column is not present, the file is read as text, which raises the
+    #error.
+    if usecols != None:
+
+        if not all(i in [j["Name"] for j in Columns] for i in usecols):
+
+            return None
+
+        Columns = [j for j in Columns if j["Name"] in usecols]
+
+    #Memory-map the columns
+    #The numeric columns of the dataframe are the memory-mapped arrays
+    #themselves. Text columns are converted from their codes.
+    Data = {}
+
+    for Column in Columns:
+
+        Values = np.load(Folder + "/" + str(Column["Index"]) + ".npy",
+                         mmap_mode = "r")
+
+        if "Categories" in Column:
+
+            Values = pd.Categorical.from_codes(
+                         Values, categories = Column["Categories"])
+
+            if Column["Type"] != "category":
+
+                Values = pd.Series(Values).astype(Column["Type"])
+
+        Data[Column["Name"]] = Values
+
+    Data = pd.DataFrame(Data, copy = False)
+
+    #Convert only the columns whose type differs
+    #Function defined above.
+    return CastColumns(Data, dtype)
+
+
+def InputCacheTypes(dtype = None):
+
+    #Return the types with which a file is read (argument dtype of function
+    #ReadTable) in the form recorded in the manifest of its cache
+
+    if dtype == None:
+
+        return None
+
+    return {i: str(dtype[i]) for i in dtype}
+
+
+def WriteInputCache(Data, path, CacheFolder, Stat, dtype = None):
+
+    #Write the cache of file path, whose data (all columns) are Data, read
+    #with types dtype, to folder CacheFolder (see function ReadInputCache).
+    #Stat is the result of function os.stat for the file before it was read,
+    #so that a file that changed while it was read is cached again the next
+    #time. Returns False,
+    #without writing the cache, if a column cannot be cached (e.g., a text
+    #column that also holds numbers), or if the cache cannot be written.
+
+    Folder = InputCacheFolder(path, CacheFolder)
+
+    Columns = []
+
+    for k, Name in enumerate(Data.columns):
+
+        Column = {"Name": Name, "Index": k, "Type": str(Data[Name].dtype)}
+
+        Values = Data[Name]
+
+        #Text and categorical columns as integer codes
+        if not (Values.dtype.kind in "biuf"):
+
+            Codes, Categories = pd.factorize(Values)
+
+            if not all(type(i) == str for i in Categories):
+
+                return False
+
+            Column["Categories"] = list(Categories)
+
+            Values = Codes.astype(np.int32)
+
+        Columns.append([Column, np.ascontiguousarray(Values)])
+
+    try:
+
+        Path(Folder).mkdir(parents = True, exist_ok = True)
+
+        #Remove the manifest first, so that a cache that is only partly
+        #written is not read
+        if exists(Folder + "/" + InputCacheManifest):
+
+            remove(Folder + "/" + InputCacheManifest)
+
+        for Column, Values in Columns:
+
+            np.save(Folder + "/" + str(Column["Index"]) + ".npy", Values)
+
+        ManifestFile = Folder + "/" + InputCacheManifest
+
+        with open(TempFileName(ManifestFile), "w") as File:
+
+            json.dump({"Version": InputCacheVersion,
+                       "Source":  abspath(path),
+                       "Size":    Stat.st_size,
+                       "MTime":   Stat.st_mtime_ns,
+                       "Types":   InputCacheTypes(dtype),
+                       "Rows":    len(Data),
+                       "Columns": [i[0] for i in Columns]}, File)
+
+        replace(TempFileName(ManifestFile), ManifestFile)
+
+    except OSError:
+
+        return False
+
+
+    return True
+
+
+##################################################
+##### Define functions to shard participants #####
+##################################################
+
+def IsShard(Shard):
+
+    #Return whether Shard is a shard of the form "k/n", where k and n are
+    #integers and 1 <= k <= n (see argument Shard of function Annotate)
+
+    if type(Shard) != str or Shard.count("/") != 1:
+
+        return False
+
+    k, n = Shard.split("/")
+
+    if not (k.strip().isdigit() and n.strip().isdigit()):
+
+        return False
+
+    return 1 <= int(k) <= int(n)
+
+
+def InShard(IDs, Shard = None):
+
+    #Return a Boolean array indicating whether each of IDs belongs to shard
+    #Shard ("k/n"). The shard of an ID is the CRC-32 checksum of the ID (as
+    #str) modulo n, so it is the same on every machine. If Shard is None,
+    #every ID belongs to it.
+
+    if Shard == None:
+
+        return np.ones(len(IDs), dtype = bool)
+
+    k, n = [int(i) for i in Shard.split("/")]
+
+    return np.array([zlib.crc32(str(i).encode("utf-8")) % n == k - 1
+                     for i in IDs], dtype = bool)
+
+
+def IDOrder(IDs):
+
+    #Return the indices that sort IDs: numerically if every ID is an integer,
+    #otherwise as text. The rows of the aggregation table are in this order,
+    #so that the table does not depend on the order in which the files are
+    #listed, and the tables of several shards can be merged into the same
+    #table (see function MergeAggregates in "Aggregate.py").
+
+    IDs = [str(i) for i in IDs]
+
+    if all(i.isdigit() for i in IDs):
+
+        Keys = [int(i) for i in IDs]
+
+    else:
+
+        Keys = IDs
+
+    return np.array(sorted(range(len(IDs)), key = lambda i: Keys[i]),
+                    dtype = np.int64)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+
+Summary
+-------
+
+Function file for the functions that record the elapsed time, rows, and bytes
+of each phase of functions Annotate and Aggregate (see files "Annotate.py"
+and "Aggregate.py"). These functions are used if argument Log or Profile of
+these functions is specified.
+
+Log records are dicts. One record is written per phase and participant (or
+file, for function Aggregate):
+
+    "Function"     = "Annotate" or "Aggregate".
+    "ID"           = Participant ID (None for phases that are not specific to
+                     a participant, e.g., "SetupAnnotations").
+    "Phase"        = Name of the phase, e.g., "Read" (reading the iMotions
+                     data file), "Label" (inserting the annotations), or
+                     "Write" (writing the annotated iMotions data file).
+    "Seconds"      = Elapsed time of the phase.
+    "Rows"         = Number of rows processed in the phase.
+    "Bytes"        = Number of bytes read or written in the phase.
+
+After the phases of a participant, one more record is written with "Phase"
+"Participant", which also has:
+
+    "PeakMemoryMB"  = Peak resident memory, in MB, of the process in which
+                      the participant was processed, up to that point (None
+                      if it cannot be determined, e.g., on Windows).
+    "Done"          = Number of participants processed so far.
+    "Total"         = Number of participants to be processed.
+    "RowsPerSecond" = Rows read per second so far, across participants.
+    "ETASeconds"    = Estimated time, in seconds, until all participants are
+                      processed.
+
+If Log is a file name, each record is appended to the file as a line of JSON
+(JSON lines). If Log is a function, it is called with each record.
+
+
+Requires
+--------
+
+- Python 3
+
+"""
+
+
+##### Import packages #####
+
+import sys
+import time
+import json
+import cProfile
+
+#The resource module is not available on Windows
+try:
+
+    import resource
+
+except ImportError:
+
+    resource = None
+
+
+##################################################
+##### Define functions to record the phases #####
+##################################################
+
+def AddPhase(Phases, Name, Start, Rows = 0, Bytes = 0):
+
+    #Add the elapsed time since Start (from time.perf_counter), Rows, and
+    #Bytes to phase Name of dict Phases. Phases that are repeated (e.g., for
+    #each chunk of a file) are summed. If Phases is None, nothing is
+    #recorded.
+
+    if Phases == None:
+
+        return
+
+    Phase = Phases.setdefault(Name, {"Seconds": 0.0, "Rows": 0, "Bytes": 0})
+
+    Phase["Seconds"] = Phase["Seconds"] + time.perf_counter() - Start
+    Phase["Rows"]    = Phase["Rows"] + Rows
+    Phase["Bytes"]   = Phase["Bytes"] + Bytes
+
+
+def AddParticipant(Phases, Start):
+
+    #Record phase "Participant" of dict Phases: the elapsed time since Start
+    #(from time.perf_counter), the rows and bytes read (phase "Read"), and
+    #the peak memory of the current process.
+
+    Read = Phases.get("Read", {"Rows": 0, "Bytes": 0})
+
+    Phases["Participant"] = {"Seconds":      time.perf_counter() - Start,
+                             "Rows":         Read["Rows"],
+                             "Bytes":        Read["Bytes"],
+                             "PeakMemoryMB": PeakMemoryMB()}
+
+
+def PeakMemoryMB():
+
+    #Return the peak resident memory of the current process in MB, or None
+    #if it cannot be determined
+
+    if resource == None:
+
+        return None
+
+    Peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    #ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+
+        return Peak / 1024 / 1024
+
+    return Peak / 1024
+
+
+def RunProfiled(ProfileFile, Function, *Args):
+
+    #Run Function with arguments Args and return its output. If ProfileFile
+    #is specified, Function is run under the Python profiler (cProfile) and
+    #the statistics are written to file ProfileFile, which can be read with
+    #module pstats (e.g., pstats.Stats(ProfileFile).sort_stats("cumulative")
+    #.print_stats(20)).
+
+    if ProfileFile == None:
+
+        return Function(*Args)
+
+    Profiler = cProfile.Profile()
+
+    try:
+
+        return Profiler.runcall(Function, *Args)
+
+    finally:
+
+        Profiler.dump_stats(ProfileFile)
+
+
+#############################################
+##### Define functions to write the log #####
+#############################################
+
+def OpenLog(Log):
+
+    #Return a function that writes a log record (see above), or None if Log
+    #is None
+
+    if Log == None or callable(Log):
+
+        return Log
+
+    def WriteRecord(Record):
+
+        with open(Log, "a") as File:
+
+            File.write(json.dumps(Record) + "\n")
+
+    return WriteRecord
+
+
+def LogPhases(WriteRecord, Function, ID, Phases):
+
+    #Write one log record per phase of dict Phases
+
+    for Name, Phase in Phases.items():
+
+        if Name == "Participant":
+
+            continue
+
+        WriteRecord({"Function": Function,
+                     "ID":       None if ID == None else str(ID),
+                     "Phase":    Name,
+                     "Seconds":  Phase["Seconds"],
+                     "Rows":     Phase["Rows"],
+                     "Bytes":    Phase["Bytes"]})
+
+
+def LogParticipant(WriteRecord, Function, ID, Phases, Progress):
+
+    #Write the log records of the phases of one participant, followed by a
+    #record of the participant with the progress so far. Progress is a dict
+    #with the start time (from time.perf_counter) of the loop across
+    #participants ("Start"), the rows read so far ("Rows"), the participants
+    #processed so far ("Done"), and the participants to be processed
+    #("Total"); it is updated.
+
+    LogPhases(WriteRecord, Function, ID, Phases)
+
+    Participant = Phases.get("Participant",
+                             {"Seconds": 0.0, "Rows": 0, "Bytes": 0,
+                              "PeakMemoryMB": None})
+
+    Progress["Rows"] = Progress["Rows"] + Participant["Rows"]
+    Progress["Done"] = Progress["Done"] + 1
+
+    Elapsed = time.perf_counter() - Progress["Start"]
+
+    WriteRecord({"Function":      Function,
+                 "ID":            str(ID),
+                 "Phase":         "Participant",
+                 "Seconds":       Participant["Seconds"],
+                 "Rows":          Participant["Rows"],
+                 "Bytes":         Participant["Bytes"],
+                 "PeakMemoryMB":  Participant["PeakMemoryMB"],
+                 "Done":          Progress["Done"],
+                 "Total":         Progress["Total"],
+                 "RowsPerSecond": Progress["Rows"] / Elapsed
+                                  if Elapsed > 0 else None,
+                 "ETASeconds":    Elapsed / Progress["Done"] * \
+                                  (Progress["Total"] - Progress["Done"])})
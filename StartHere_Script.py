@@ -160,6 +160,8 @@ Requires
 - NumPy
 - Annotate.py (custom file)
 - Aggregate.py (custom file)
+- DataFiles.py (custom file)
+- AnnotateAggregate.py (custom file; optional, see end of script)
 
 
 Author
@@ -201,7 +203,33 @@ OutputDataFolder = "G:/My Drive/U Akron/CBA RA/Hamdani/Output/iMotions"
 
 #Run annotation code
 #This may take about an hour to run if using the data of about 100 
-#participants.
+#participants. To annotate several participants at the same time, each in a
+#separate process, specify argument Jobs (e.g., Jobs = 4; see "Annotate.py").
+#To write the annotated files in a binary format that is faster to write and
+#to aggregate, specify argument OutputFormat (e.g., OutputFormat = "parquet").
+#To compress them, specify argument Compression (e.g., Compression = "gzip").
+#To write only a small index of the rows of each event instead of annotated
+#files, specify argument EventIndex (e.g., EventIndex = "study"); function
+#Aggregate then reads the original iMotions data files.
+#Participants whose annotated files are already up to date (see
+#"Manifest.json" in OutputDataFolder) are skipped; to annotate all
+#participants again, specify Incremental = False.
+#To write smaller annotated files, specify the columns to keep (e.g.,
+#KeepColumns = ['Anger', 'Joy']) and/or drop rows without an event
+#(TrimRows = True).
+#To record the time, rows, and bytes of each phase of each participant, and
+#the progress, specify a log file (e.g., Log = 'C:/.../AnnotateLog.jsonl');
+#to profile one participant, specify its ID (e.g., Profile = 4001). Function
+#Aggregate has the same arguments.
+#To read the next participants and write the previous ones on background
+#threads while a participant is annotated, e.g., on a network drive, specify
+#argument Pipeline (e.g., Pipeline = 2).
+#To parse the iMotions data files only once when the annotations are changed
+#and Annotate is run again, specify argument InputCache, a folder for a binary
+#cache of the data files (e.g., InputCache = "C:/Users/User1/iMotionsCache").
+#To split the participants across several machines, specify argument Shard
+#on each machine, e.g., Shard = "1/4" to "4/4" on four machines, each with its
+#own OutputDataFolder.
 Annotate(ExcelFile, InputDataFolder, OutputDataFolder)
 
 
@@ -216,5 +244,46 @@ ExpressionNames = \
 AggregateFile = "G:/My Drive/U Akron/CBA RA/Hamdani/Output/Aggregated/AggTable.csv"
 
 #Run aggregation code
+#To aggregate several files at the same time, each in a separate process,
+#specify argument Jobs (e.g., Jobs = 4; see "Aggregate.py").
+#To compute other statistics than the mean in the same pass, specify argument
+#Statistics (e.g., Statistics = ['count', 'mean', 'sd', 'min', 'max']); to
+#write one row per ID, event, and expression, specify Layout = "long".
+#To compute the statistics for time bins within each event, e.g., 5-second
+#bins from the onset of each event, specify BinWidth = 5.
+#If the participants were split into shards (see Annotate above), aggregate
+#each shard with the same argument Shard and a separate AggregateFile, then
+#merge the tables of the shards into AggregateFile with function
+#MergeAggregates (file "Aggregate.py"), e.g.,
+#MergeAggregates(["C:/AggTable_1.csv", "C:/AggTable_2.csv"], AggregateFile).
 Aggregate(ExpressionNames, OutputDataFolder, AggregateFile)
 
+
+##### Alternative: annotate and aggregate in a single pass #####
+
+#Function AnnotateAggregate (file "AnnotateAggregate.py") can be run instead of
+#functions Annotate and Aggregate above. It reads each iMotions data file once
+#and aggregates it directly into the aggregation table, so the annotated
+#iMotions data files do not have to be written and read again. They are only
+#written if argument OutputDataFolder is specified.
+
+#from AnnotateAggregate import AnnotateAggregate
+
+#AnnotateAggregate(ExcelFile, InputDataFolder, ExpressionNames, AggregateFile,
+#                  OutputDataFolder = None)
+
+
+##### Alternative: annotate and aggregate in memory #####
+
+#Function AnnotateFrames (file "Annotate.py") returns the annotated iMotions
+#data sets one participant at a time, as (ID, data set) pairs, without
+#writing any file, e.g., to work with them in a notebook. Function
+#AggregateFrames (file "Aggregate.py") aggregates such data sets and returns
+#the aggregation table (and writes it, if AggregateFile is specified).
+
+#from Annotate import AnnotateFrames
+#from Aggregate import AggregateFrames
+
+#AggregateTable = \
+#    AggregateFrames(AnnotateFrames(ExcelFile, InputDataFolder),
+#                    ExpressionNames, AggregateFile)